@@ -0,0 +1,47 @@
+"""pg_trgm GIN indexes for business/service search
+
+Revision ID: a4d7f3e2c816
+Revises: 5b2e8c41d9a0
+Create Date: 2026-10-18 10:10:00.000000
+
+Lets the `%` similarity operator used by list_businesses/list_services run as a
+bitmap index scan instead of a sequential scan.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a4d7f3e2c816'
+down_revision = '5b2e8c41d9a0'
+branch_labels = None
+depends_on = None
+
+TRGM_INDEXES = [
+    ('ix_businesses_name_trgm', 'businesses', 'name'),
+    ('ix_businesses_description_trgm', 'businesses', 'description'),
+    ('ix_businesses_category_trgm', 'businesses', 'category'),
+    ('ix_services_name_trgm', 'services', 'name'),
+    ('ix_services_description_trgm', 'services', 'description'),
+]
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Build without locking writes on live tables
+    with op.get_context().autocommit_block():
+        for name, table, column in TRGM_INDEXES:
+            op.create_index(
+                name,
+                table,
+                [column],
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in TRGM_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
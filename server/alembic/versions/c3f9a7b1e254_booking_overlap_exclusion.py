@@ -0,0 +1,39 @@
+"""prevent overlapping bookings per service
+
+Revision ID: c3f9a7b1e254
+Revises: a4d7f3e2c816
+Create Date: 2026-10-18 10:20:00.000000
+
+Two non-cancelled bookings of the same service may not overlap in time. The
+exclusion constraint serializes concurrent inserts in the database, across all
+workers. Existing overlapping rows must be cleaned up (e.g. cancelled) first.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c3f9a7b1e254'
+down_revision = 'a4d7f3e2c816'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.create_check_constraint('ck_bookings_time_order', 'bookings', 'end_time > start_time')
+    op.execute(
+        """
+        ALTER TABLE bookings
+        ADD CONSTRAINT ex_bookings_no_overlap
+        EXCLUDE USING gist (
+            service_id WITH =,
+            tstzrange(start_time, end_time, '[)') WITH &&
+        )
+        WHERE (status <> 'cancelled')
+        """
+    )
+
+
+def downgrade():
+    op.drop_constraint('ex_bookings_no_overlap', 'bookings')
+    op.drop_constraint('ck_bookings_time_order', 'bookings', type_='check')
@@ -0,0 +1,44 @@
+"""indexes for the routers' filter and keyset-pagination columns
+
+Revision ID: e8b1d6c4a372
+Revises: c3f9a7b1e254
+Create Date: 2026-10-18 11:00:00.000000
+
+Composite indexes lead with the filtered column and end with the keyset sort
+key (created_at, id), so filtered list pages are index range scans. Built
+CONCURRENTLY so existing tables stay writable during the migration.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e8b1d6c4a372'
+down_revision = 'c3f9a7b1e254'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # Availability lookups and per-service booking lists
+    ('ix_bookings_service_id_start_time', 'bookings', ['service_id', 'start_time']),
+    # "My bookings", newest first
+    ('ix_bookings_user_id_created_at', 'bookings', ['user_id', 'created_at', 'id']),
+    ('ix_bookings_created_at_id', 'bookings', ['created_at', 'id']),
+    # Services of a business (also the business_id foreign key)
+    ('ix_services_business_id_created_at', 'services', ['business_id', 'created_at', 'id']),
+    ('ix_services_owner_id', 'services', ['owner_id']),
+    ('ix_services_created_at_id', 'services', ['created_at', 'id']),
+    ('ix_businesses_owner_id', 'businesses', ['owner_id']),
+    ('ix_businesses_created_at_id', 'businesses', ['created_at', 'id']),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,39 @@
+"""business coordinates with an earthdistance index
+
+Revision ID: f2a9c5e7b318
+Revises: e8b1d6c4a372
+Create Date: 2026-10-18 11:30:00.000000
+
+cube/earthdistance ship with Postgres contrib (no PostGIS needed). The GiST
+index on ll_to_earth(latitude, longitude) serves both the earth_box() radius
+filter and `<->` nearest-first ordering in list_businesses.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f2a9c5e7b318'
+down_revision = 'e8b1d6c4a372'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS cube')
+    op.execute('CREATE EXTENSION IF NOT EXISTS earthdistance')
+    op.add_column('businesses', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('businesses', sa.Column('longitude', sa.Float(), nullable=True))
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_businesses_earth
+            ON businesses USING gist (ll_to_earth(latitude, longitude))
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+            """
+        )
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_businesses_earth')
+    op.drop_column('businesses', 'longitude')
+    op.drop_column('businesses', 'latitude')
@@ -0,0 +1,123 @@
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+# Minutes since midnight, [start, end)
+Window = Tuple[int, int]
+
+
+def _parse_clock(value: str) -> int:
+    hours, minutes = value.strip().split(":")
+    total = int(hours) * 60 + int(minutes)
+    if not 0 <= total <= 24 * 60:
+        raise ValueError(f"Invalid time of day: {value!r}")
+    return total
+
+
+def merge_intervals(intervals: Iterable[Tuple]) -> List[Tuple]:
+    """Sort and merge overlapping or touching [start, end) intervals."""
+    merged: List[list] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [tuple(interval) for interval in merged]
+
+
+@lru_cache(maxsize=4096)
+def parse_windows(available_days: Tuple[str, ...], available_hours: Tuple[str, ...]) -> Dict[int, List[Window]]:
+    """Parse a service's day names and "HH:MM-HH:MM" ranges into weekday -> merged windows.
+
+    Cached, so each distinct schedule is parsed once per process.
+    """
+    hours = merge_intervals(
+        tuple(_parse_clock(part) for part in value.split("-", 1))
+        for value in available_hours
+    )
+    hours = [(start, end) for start, end in hours if end > start]
+    weekdays = {WEEKDAYS.index(day.strip().lower()[:3]) for day in available_days}
+    return {weekday: hours for weekday in sorted(weekdays)}
+
+
+class BusyIndex:
+    """Merged, sorted busy intervals with O(log n) lookup of the first one ending after a time."""
+
+    def __init__(self, intervals: Iterable[Tuple[datetime, datetime]], presorted: bool = False):
+        if presorted:
+            # Already ordered by start and non-overlapping, e.g. live bookings of one service
+            # (the exclusion constraint guarantees it), so merging would change nothing
+            intervals = list(intervals)
+            self.starts = [start for start, _ in intervals]
+            self.ends = [end for _, end in intervals]
+        else:
+            merged = merge_intervals(intervals)
+            self.starts = [start for start, _ in merged]
+            self.ends = [end for _, end in merged]
+
+    def free_between(
+        self, start: datetime, end: datetime, min_length: timedelta = timedelta(0)
+    ) -> List[Tuple[datetime, datetime]]:
+        """Sub-intervals of [start, end) not covered by any busy interval, skipping any
+        shorter than `min_length`."""
+        starts, ends = self.starts, self.ends
+        free = []
+        cursor = start
+        i = bisect_right(ends, start)
+        while i < len(starts) and starts[i] < end:
+            if starts[i] - cursor >= min_length and starts[i] > cursor:
+                free.append((cursor, starts[i]))
+            if ends[i] > cursor:
+                cursor = ends[i]
+            i += 1
+        if cursor < end and end - cursor >= min_length:
+            free.append((cursor, end))
+        return free
+
+
+def free_slots(
+    windows: Dict[int, List[Window]],
+    duration: int,
+    busy: BusyIndex,
+    range_start: datetime,
+    range_end: datetime,
+    tz: tzinfo,
+    step: int = 0,
+) -> List[Tuple[datetime, datetime]]:
+    """Bookable [start, end) slots of `duration` minutes inside the service windows.
+
+    Windows are wall-clock times in `tz`; slots start every `step` minutes
+    (default: back to back) within each free interval.
+    """
+    if duration <= 0 or step < 0:
+        raise ValueError("duration must be positive and step non-negative")
+    length = timedelta(minutes=duration)
+    stride = timedelta(minutes=step or duration)
+    # Compared in UTC: aware datetimes sharing one tzinfo compare without utcoffset() calls
+    range_start, range_end = range_start.astimezone(timezone.utc), range_end.astimezone(timezone.utc)
+    slots = []
+    day: date = range_start.astimezone(tz).date()
+    last_day: date = range_end.astimezone(tz).date()
+    while day <= last_day:
+        midnight = datetime.combine(day, time(), tzinfo=tz)
+        for window_start, window_end in windows.get(day.weekday(), ()):
+            start = (midnight + timedelta(minutes=window_start)).astimezone(timezone.utc)
+            end = (midnight + timedelta(minutes=window_end)).astimezone(timezone.utc)
+            start, end = max(start, range_start), min(end, range_end)
+            if end - start < length:
+                continue
+            for free_start, free_end in busy.free_between(start, end, length):
+                slot = free_start
+                while slot + length <= free_end:
+                    slots.append((slot.astimezone(tz), (slot + length).astimezone(tz)))
+                    slot += stride
+        day += timedelta(days=1)
+    return slots
+
+
+def as_tuple(values: Sequence[str]) -> Tuple[str, ...]:
+    return tuple(values or ())
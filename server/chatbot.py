@@ -1,28 +1,95 @@
 import os
 import json
-import subprocess
-import sys
-import re
-from typing import Dict, Any, Optional
-from datetime import datetime
+import asyncio
+from typing import AsyncIterator, Dict, Any, List, Optional
+import httpx
 from dotenv import load_dotenv
-from fastapi import APIRouter, Query, Depends
-from sqlalchemy.orm import Session
-from database import engine, get_db
-from sqlalchemy import text
+from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_read_db, query_budget
+from sqlalchemy import select, func, or_, union
+import models
+from cache import TTLCache, MISSING, get_version
+from metrics import HistogramFamily
+import time
 
 router = APIRouter()
 
-if os.getenv("GITHUB_ACTIONS") is None:
-   load_dotenv()
-   API_KEY=os.getenv("APIKEY")
-else :
-    API_KEY = os.environ["APIKEY"]
-if not API_KEY:
-    raise ValueError(" Missing API key")
+# ✅ Gemini API key, resolved on first chatbot request rather than at import
+API_KEY: Optional[str] = None
 
-def call_gemini_api(api_key: str, prompt: str, model: str = "gemini-2.0-flash") -> Optional[Dict[str, Any]]:
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
+def get_api_key() -> str:
+    global API_KEY
+    if API_KEY is None:
+        if os.getenv("GITHUB_ACTIONS") is None:
+            load_dotenv()
+        API_KEY = os.getenv("APIKEY") or ""
+    if not API_KEY:
+        raise HTTPException(status_code=503, detail="Chatbot is not configured: missing API key")
+    return API_KEY
+
+# ✅ Shared HTTP client for Gemini calls (keep-alive pooling, timeouts, bounded concurrency)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com")
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "20"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", str(GEMINI_MAX_CONNECTIONS)))
+
+# ✅ Response caches: final answers keyed on (normalized query, businesses version),
+# raw LLM responses keyed on (model, prompt)
+CHAT_CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", "512"))
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", "300"))
+answer_cache = TTLCache(maxsize=CHAT_CACHE_SIZE, ttl=CHAT_CACHE_TTL)
+llm_cache = TTLCache(maxsize=CHAT_CACHE_SIZE, ttl=CHAT_CACHE_TTL)
+
+# ✅ Retrieval limits: how many businesses/services reach the prompt
+CHAT_TOP_K = int(os.getenv("CHAT_TOP_K", "10"))
+CHAT_SERVICES_PER_BUSINESS = int(os.getenv("CHAT_SERVICES_PER_BUSINESS", "5"))
+CHAT_DESCRIPTION_CHARS = int(os.getenv("CHAT_DESCRIPTION_CHARS", "160"))
+# Question words matched against the trigram-indexed columns, longest first
+CHAT_MAX_KEYWORDS = int(os.getenv("CHAT_MAX_KEYWORDS", "8"))
+CHAT_STOPWORDS = frozenset(
+    "and any are can does for from get have how near nearby one some the there what when where which who with you your".split()
+)
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+LLM_REQUEST_SECONDS = HistogramFamily(
+    "llm_request_duration_seconds", "Outbound Gemini call latency", ["model", "outcome"]
+)
+LLM_FIRST_CHUNK_SECONDS = HistogramFamily(
+    "llm_first_chunk_seconds", "Time to the first streamed Gemini chunk", ["model"]
+)
+
+_http_client: Optional[httpx.AsyncClient] = None
+_gemini_semaphore: Optional[asyncio.Semaphore] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide async client, creating it on first use."""
+    global _http_client, _gemini_semaphore
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=GEMINI_BASE_URL,
+            timeout=httpx.Timeout(GEMINI_TIMEOUT, connect=min(GEMINI_TIMEOUT, 5.0)),
+            limits=httpx.Limits(
+                max_connections=GEMINI_MAX_CONNECTIONS,
+                max_keepalive_connections=GEMINI_MAX_CONNECTIONS,
+            ),
+            headers={"Content-Type": "application/json"},
+        )
+        _gemini_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+    return _http_client
+
+async def close_http_client() -> None:
+    """Close the shared client (called on application shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+async def call_gemini_api(api_key: str, prompt: str, model: str = "gemini-2.0-flash") -> Optional[Dict[str, Any]]:
+    url = f"/v1beta/models/{model}:generateContent"
     
     data = {
         "contents": [
@@ -34,20 +101,71 @@ def call_gemini_api(api_key: str, prompt: str, model: str = "gemini-2.0-flash")
         ]
     }
     
+    cache_key = (model, prompt)
+    cached = llm_cache.get(cache_key)
+    if cached is not MISSING:
+        return cached
+
+    client = get_http_client()
+    outcome = "error"
+    start = time.perf_counter()
     try:
-        result = subprocess.run(
-            ["curl", "-X", "POST", "-H", "Content-Type: application/json",
-             "-d", json.dumps(data), url],
-            capture_output=True, text=True, check=True
-        )
-        return json.loads(result.stdout)
-    except subprocess.CalledProcessError as e:
+        async with _gemini_semaphore:
+            start = time.perf_counter()
+            response = await client.post(url, params={"key": api_key}, json=data)
+        response.raise_for_status()
+        result = response.json()
+        outcome = "ok"
+        llm_cache.set(cache_key, result)
+        return result
+    except httpx.HTTPStatusError as e:
         print(f"API call failed: {e}")
-        print(f"stderr: {e.stderr}")
+        print(f"body: {e.response.text}")
+        return None
+    except httpx.HTTPError as e:
+        print(f"API call failed: {e!r}")
         return None
     except json.JSONDecodeError as e:
         print(f"Failed to parse API response: {e}")
         return None
+    finally:
+        LLM_REQUEST_SECONDS.labels(model, outcome).observe(time.perf_counter() - start)
+
+async def stream_gemini_api(api_key: str, prompt: str, model: str = "gemini-2.0-flash") -> AsyncIterator[str]:
+    """Yield answer text chunks from Gemini's SSE streaming endpoint as they arrive."""
+    url = f"/v1beta/models/{model}:streamGenerateContent"
+    data = {"contents": [{"parts": [{"text": prompt}]}]}
+
+    client = get_http_client()
+    outcome = "error"
+    start = time.perf_counter()
+    first_chunk = True
+    try:
+        async with _gemini_semaphore:
+            start = time.perf_counter()
+            async with client.stream("POST", url, params={"alt": "sse", "key": api_key}, json=data) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    text = format_gemini_chunk(json.loads(line[5:]))
+                    if not text:
+                        continue
+                    if first_chunk:
+                        first_chunk = False
+                        LLM_FIRST_CHUNK_SECONDS.labels(model).observe(time.perf_counter() - start)
+                    yield text
+        outcome = "ok"
+    finally:
+        LLM_REQUEST_SECONDS.labels(model, outcome).observe(time.perf_counter() - start)
+
+def format_gemini_chunk(chunk: Dict[str, Any]) -> str:
+    """Text of one streamed response chunk (empty for chunks without text)."""
+    try:
+        parts = chunk["candidates"][0]["content"]["parts"]
+    except (KeyError, IndexError, TypeError):
+        return ""
+    return "".join(part.get("text", "") for part in parts)
 
 def create_sql_query(query: str) -> str:
     return f"""
@@ -106,45 +224,151 @@ def format_gemini_response(response):
             "answer": "Oops! I ran into a technical issue while processing your question. I'm still learning how to answer questions like this. Could you try asking in a different way?"
         }
 
-def retrieve_data_from_db(query: str, db: Session) -> Optional[Dict[str, Any]]:
-    """Retrieve data from the database."""
+def query_keywords(query: str) -> List[str]:
+    """Distinct words of three or more letters in the question, minus stopwords."""
+    words = "".join(char if char.isalnum() else " " for char in query.lower()).split()
+    keywords = {word for word in words if len(word) >= 3 and word not in CHAT_STOPWORDS}
+    return sorted(keywords, key=lambda word: (-len(word), word))[:CHAT_MAX_KEYWORDS]
+
+def keyword_match(columns, keywords):
+    # `column %> word` is word_similarity(word, column) >= pg_trgm.word_similarity_threshold,
+    # which the gin_trgm_ops indexes serve
+    return or_(*(column.op("%>")(word) for word in keywords for column in columns))
+
+RETRIEVED_BUSINESS_COLUMNS = (
+    models.Business.id,
+    models.Business.name,
+    models.Business.description,
+    models.Business.category,
+    models.Business.business_type,
+    models.Business.location,
+    models.Business.address,
+    models.Business.phone,
+    models.Business.allows_delivery,
+)
+
+def build_retrieval_queries(query: str):
+    """Build the business queries to try in order and the matching services query.
+
+    The first ranks only businesses whose name, category, description or a service
+    name matches a keyword of the question, found through the trigram indexes; the
+    last returns any CHAT_TOP_K businesses unranked, for questions nothing matches.
+    """
+    query = query.strip()
+    active = models.Business.is_active.isnot(False)
+    businesses_queries = []
+    keywords = query_keywords(query)
+    if keywords:
+        # A UNION of index scans; an OR across the two tables would scan every business
+        matched_ids = union(
+            select(models.Business.id).where(keyword_match(
+                (models.Business.name, models.Business.category, models.Business.description), keywords
+            )),
+            select(models.Service.business_id).where(keyword_match((models.Service.name,), keywords)),
+        )
+        service_rank = (
+            select(func.max(func.word_similarity(models.Service.name, query)))
+            .where(models.Service.business_id == models.Business.id)
+            .correlate(models.Business)
+            .scalar_subquery()
+        )
+        rank = func.greatest(
+            func.word_similarity(models.Business.name, query),
+            func.word_similarity(models.Business.category, query),
+            func.word_similarity(models.Business.business_type, query),
+            func.similarity(func.coalesce(models.Business.description, ""), query),
+            func.coalesce(service_rank, 0),
+        ).label("rank")
+        businesses_queries.append(
+            select(*RETRIEVED_BUSINESS_COLUMNS, rank)
+            .where(models.Business.id.in_(matched_ids), active)
+            .order_by(rank.desc())
+            .limit(CHAT_TOP_K)
+        )
+    businesses_queries.append(select(*RETRIEVED_BUSINESS_COLUMNS).where(active).limit(CHAT_TOP_K))
+
+    def services_query(business_ids):
+        position = func.row_number().over(
+            partition_by=models.Service.business_id,
+            order_by=func.word_similarity(models.Service.name, query).desc(),
+        ).label("position")
+        ranked = (
+            select(
+                models.Service.business_id,
+                models.Service.name,
+                models.Service.price,
+                models.Service.duration,
+                models.Service.available_days,
+                models.Service.available_hours,
+                position,
+            )
+            .where(
+                models.Service.business_id.in_(business_ids),
+                models.Service.is_active.isnot(False),
+            )
+            .subquery()
+        )
+        return select(ranked).where(ranked.c.position <= CHAT_SERVICES_PER_BUSINESS)
+
+    return businesses_queries, services_query
+
+def render_retrieved_rows(businesses, services) -> str:
+    """Render retrieved rows as one compact line per business."""
+    services_by_business: Dict[Any, list] = {}
+    for service in services:
+        details = [f"price {service.price:g}", f"{service.duration} min"]
+        availability = " ".join(
+            ",".join(values) for values in (service.available_days, service.available_hours) if values
+        )
+        if availability:
+            details.append(availability)
+        services_by_business.setdefault(service.business_id, []).append(
+            f"{service.name} ({', '.join(details)})"
+        )
+
+    lines = []
+    for business in businesses:
+        description = (business.description or "").strip()
+        if len(description) > CHAT_DESCRIPTION_CHARS:
+            description = description[:CHAT_DESCRIPTION_CHARS].rstrip() + "..."
+        parts = [
+            f"{business.name} ({business.category}, {business.business_type})",
+            f"{business.location}, {business.address}",
+        ]
+        if description:
+            parts.append(description)
+        if business.phone:
+            parts.append(f"phone {business.phone}")
+        parts.append("delivery" if business.allows_delivery else "no delivery")
+        business_services = services_by_business.get(business.id)
+        if business_services:
+            parts.append("services: " + "; ".join(business_services))
+        lines.append("- " + " | ".join(parts))
+    return "\n".join(lines)
+
+async def retrieve_data_from_db(query: str, db: AsyncSession) -> Optional[str]:
+    """Retrieve the top-k businesses relevant to the query, rendered for the prompt."""
     try:
-        # Get an sql query prompt
-        # sql_prompt = create_sql_query(query)
-        sql_prompt = "SELECT * FROM businesses"
-        # calling gemini for sqlquery
-        gemini_response = call_gemini_api(API_KEY, sql_prompt)
-        print("🛑", gemini_response)
-        
-        # Extract the SQL query from the Gemini response
-        if gemini_response and 'candidates' in gemini_response and gemini_response['candidates']:
-            candidate = gemini_response['candidates'][0]
-            if 'content' in candidate and 'parts' in candidate['content']:
-                # Extract the SQL query text from the response
-                sql_text = candidate['content']['parts'][0]['text']
-                # Remove markdown code block formatting if present
-                sql_query = re.sub(r'```sql\n|\n```', '', sql_text).strip()
-                
-                # Use SQLAlchemy's text() function to create a SQL expression
-                # sql_expression = text(sql_query)
-                sql_expression = text(sql_prompt)
-                
-                # Execute the query
-                result = db.execute(sql_expression)
-                print("🛑 SQL Query Executed:", sql_query)
-                
-                # Fetch the results
-                rows = result.fetchall()
-                print("🛑 Query Results:", rows)
-                
-                # Return the results
-                return rows
-            
-        return None
+        businesses_queries, services_query = build_retrieval_queries(query)
+        for businesses_query in businesses_queries:
+            businesses = (await db.execute(businesses_query)).all()
+            if businesses:
+                break
+        else:
+            return None
+        services = (await db.execute(services_query([b.id for b in businesses]))).all()
+        return render_retrieved_rows(businesses, services)
     except Exception as e:
         print(f"Error retrieving data from database: {e}")
         return None
 
+# Instruction echoes the model sometimes puts before the answer
+PREFIXES_TO_REMOVE = [
+    "Okay, here's a human-like response to the user's question, mixing up the data and presenting it conversationally:",
+    "Here's a human-like response:",
+    "Human-like response:",
+]
+
 def clean_and_format_response(response_text):
     if "\"" in response_text:
         # Extract content between double quotes, which contains the actual response
@@ -164,34 +388,94 @@ def clean_and_format_response(response_text):
     clean_text = response_text
     
     # Remove common instruction patterns
-    prefixes_to_remove = [
-        "Okay, here's a human-like response to the user's question, mixing up the data and presenting it conversationally:",
-        "Here's a human-like response:",
-        "Human-like response:"
-    ]
-    
-    for prefix in prefixes_to_remove:
+    for prefix in PREFIXES_TO_REMOVE:
         if clean_text.startswith(prefix):
             clean_text = clean_text[len(prefix):].strip()
     
     return clean_text
 
-@router.get('/chat_ai')
-async def chat_ai(query: str = Query(..., description="Enter your query"), db: Session = Depends(get_db)):
+# ✅ Incremental version of clean_and_format_response for streamed answers
+# Characters after a quote before it is taken as an inner quote rather than the closing one
+CLEAN_QUOTE_HOLD = int(os.getenv("CLEAN_QUOTE_HOLD", "200"))
+
+class StreamingCleaner:
+    """Apply the clean_and_format_response rules to text arriving in chunks.
+
+    Text is held back only until it is known whether the answer (after any
+    instruction prefix) opens with a quote. In that case everything from the latest
+    quote onwards is held, since it may be the closing one, until more than
+    CLEAN_QUOTE_HOLD characters follow it. Unlike the batch version, a quote deep
+    inside an unquoted answer is left as-is rather than used to crop it.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.mode: Optional[str] = None  # None (undecided), "quote" or "plain"
+
+    def feed(self, chunk: str) -> str:
+        self.buffer += chunk
+        if self.mode is None and not self._decide():
+            return ""
+        if self.mode == "quote":
+            end = self.buffer.rfind('"')
+            if end == -1 or len(self.buffer) - end > CLEAN_QUOTE_HOLD:
+                end = len(self.buffer)
+            out, self.buffer = self.buffer[:end], self.buffer[end:]
+            return out
+        out, self.buffer = self.buffer, ""
+        return out
+
+    def finish(self) -> str:
+        if self.mode is None:
+            return clean_and_format_response(self.buffer)
+        out = self.buffer
+        if self.mode == "quote" and '"' in out:
+            # Drop the closing quote and anything after it
+            out = out[:out.rfind('"')]
+        self.buffer = ""
+        return out
+
+    def _decide(self) -> bool:
+        text = self.buffer
+        for prefix in PREFIXES_TO_REMOVE:
+            if prefix.startswith(text):
+                return False  # could still be an instruction prefix
+            if text.startswith(prefix):
+                text = text[len(prefix):].lstrip()
+        if not text.lstrip():
+            return False
+        if text.lstrip().startswith('"'):
+            self.mode = "quote"
+            self.buffer = text.lstrip()[1:]
+        else:
+            self.mode = "plain"
+            self.buffer = text
+        return True
+
+@router.get('/chat_ai', dependencies=[Depends(query_budget(3))])
+async def chat_ai(query: str = Query(..., description="Enter your query"), db: AsyncSession = Depends(get_read_db)):
+    api_key = get_api_key()
     try:
+        cache_key = (normalize_query(query), get_version("businesses"))
+        cached = answer_cache.get(cache_key)
+        if cached is not MISSING:
+            return {"answer": cached}
+
         # Retrieve data from database
-        data = retrieve_data_from_db(query, db)
+        data = await retrieve_data_from_db(query, db)
         if data is None:
             # Direct Gemini response when no database data is found
-            direct_response = call_gemini_api(API_KEY, query)
+            direct_response = await call_gemini_api(api_key, query)
             formatted_response = format_gemini_response(direct_response)
+            if direct_response is not None:
+                answer_cache.set(cache_key, formatted_response["answer"])
             return {"answer": formatted_response["answer"]}
             
         # Create prompt with the database data
-        query_with_data = create_query_prompt(data.__str__(), query)
+        query_with_data = create_query_prompt(data, query)
         
         # Call the Gemini API
-        response = call_gemini_api(API_KEY, query_with_data)
+        response = await call_gemini_api(api_key, query_with_data)
         if response is None:
             return {"answer": "Failed to get a valid response from the API"}
             
@@ -200,8 +484,73 @@ async def chat_ai(query: str = Query(..., description="Enter your query"), db: S
         
         # Clean the formatted response
         cleaned_text = clean_and_format_response(formatted_response["answer"])
+        answer_cache.set(cache_key, cleaned_text)
         
         # Return the answer in the expected format
         return {"answer": cleaned_text}
     except Exception as e:
-        return {"answer": f"Error: {str(e)}"}
\ No newline at end of file
+        return {"answer": f"Error: {str(e)}"}
+
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+async def stream_answer(api_key: str, query: str, cache_key, data: Optional[str]) -> AsyncIterator[str]:
+    """SSE body: "message" events carrying answer text, then a "done" (or "error") event."""
+    if data is None:
+        # Direct Gemini response when no database data is found (no cleanup, as in chat_ai)
+        prompt, cleaner = query, None
+    else:
+        prompt, cleaner = create_query_prompt(data, query), StreamingCleaner()
+
+    answer = []
+    try:
+        async for chunk in stream_gemini_api(api_key, prompt):
+            text = cleaner.feed(chunk) if cleaner else chunk
+            if text:
+                answer.append(text)
+                yield sse_event({"text": text})
+        text = cleaner.finish() if cleaner else ""
+        if text:
+            answer.append(text)
+            yield sse_event({"text": text})
+    except (httpx.HTTPError, json.JSONDecodeError) as e:
+        print(f"Streaming API call failed: {e!r}")
+        yield sse_event({"error": "Failed to get a valid response from the API"}, event="error")
+        return
+    answer_cache.set(cache_key, "".join(answer))
+    yield sse_event({}, event="done")
+
+async def replay_answer(answer: str) -> AsyncIterator[str]:
+    yield sse_event({"text": answer})
+    yield sse_event({}, event="done")
+
+# ✅ Streaming variant of chat_ai: Server-Sent Events forwarded as Gemini produces tokens
+@router.get('/chat_ai/stream', dependencies=[Depends(query_budget(3))])
+async def chat_ai_stream(query: str = Query(..., description="Enter your query"), db: AsyncSession = Depends(get_read_db)):
+    api_key = get_api_key()
+    cache_key = (normalize_query(query), get_version("businesses"))
+    cached = answer_cache.get(cache_key)
+    if cached is not MISSING:
+        body = replay_answer(cached)
+    else:
+        # Retrieval runs before the response starts, while the request's session is open
+        data = await retrieve_data_from_db(query, db)
+        body = stream_answer(api_key, query, cache_key, data)
+    return StreamingResponse(
+        body,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            # Marks the body as already encoded so the compression middleware passes
+            # events through instead of buffering them in the compressor
+            "Content-Encoding": "identity",
+        },
+    )
+
+# ✅ Cache hit/miss counters
+@router.get('/cache_stats')
+def cache_stats():
+    return {"answers": answer_cache.stats(), "llm": llm_cache.stats()}
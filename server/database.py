@@ -1,22 +1,253 @@
-from sqlalchemy import create_engine
+import asyncio
+from contextvars import ContextVar
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from dotenv import load_dotenv
+from cache import TTLCache, MISSING
+from metrics import HistogramFamily, register_collector
 import os
+import time
 
 load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+def to_async_url(url: str) -> str:
+    """Swap the sync driver in a database URL for asyncpg."""
+    return make_url(url).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(SQLALCHEMY_DATABASE_URL)
+
+# ✅ Optional streaming read replica for read-only routes (see get_read_db)
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+
+# ✅ Pool tuning from the environment (applies to both engines)
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "-1")),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes"),
+}
+
+# ✅ Pool and statement timings, labelled by engine name ("sync" / "async")
+pool_wait_seconds = HistogramFamily("db_pool_wait_seconds", "Time spent waiting for a pooled connection", ["engine"])
+statement_seconds = HistogramFamily("db_statement_duration_seconds", "SQL statement execution time", ["engine"])
+
+# ✅ Per-request statement count/time; set by MetricsMiddleware (middleware.py)
+request_query_stats: ContextVar[Optional[dict]] = ContextVar("request_query_stats", default=None)
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection."""
+    metrics_name = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait_seconds.labels(self.metrics_name).observe(time.perf_counter() - start)
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long callers wait for a connection."""
+    metrics_name = "async"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait_seconds.labels(self.metrics_name).observe(time.perf_counter() - start)
+
+class TimedReplicaQueuePool(TimedAsyncQueuePool):
+    metrics_name = "replica"
+
+def install_statement_timing(sync_engine, name: str) -> None:
+    """Record the duration of every statement executed on the engine."""
+    histogram = statement_seconds.labels(name)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        histogram.observe(elapsed)
+        stats = request_query_stats.get()
+        if stats is not None:
+            stats["count"] += 1
+            stats["seconds"] += elapsed
+
+# ✅ Statement budget per endpoint: exceeding it logs, or fails the request when
+# QUERY_BUDGET_STRICT is set (the test suite sets it; see tests/test_query_budgets.py)
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "false").lower() in ("1", "true", "yes")
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+def query_budget(max_statements: int):
+    """Route dependency asserting the endpoint (including serialization) runs at most
+    `max_statements` SQL statements."""
+    async def enforce_query_budget():
+        stats = request_query_stats.get()
+        start = stats["count"] if stats is not None else 0
+        yield
+        if stats is None:
+            return
+        used = stats["count"] - start
+        if used > max_statements:
+            message = f"{used} SQL statements executed, budget is {max_statements}"
+            if QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            print(f"⚠️ Query budget exceeded: {message}")
+    return enforce_query_budget
+
+def pool_status(engine) -> dict:
+    """Snapshot of a QueuePool's checked-out, idle and overflow connections."""
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": POOL_SETTINGS["max_overflow"],
+    }
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=TimedQueuePool, **POOL_SETTINGS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+install_statement_timing(engine, "sync")
+
+# ✅ Async engine for read paths that should not tie up the threadpool
+async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=TimedAsyncQueuePool, **POOL_SETTINGS)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+install_statement_timing(async_engine.sync_engine, "async")
+
+if READ_DATABASE_URL:
+    read_async_engine = create_async_engine(to_async_url(READ_DATABASE_URL), poolclass=TimedReplicaQueuePool, **POOL_SETTINGS)
+    install_statement_timing(read_async_engine.sync_engine, "replica")
+else:
+    read_async_engine = async_engine
+AsyncReadSessionLocal = async_sessionmaker(read_async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+def _pool_metrics() -> list:
+    lines = ["# HELP db_pool_connections Pooled connections by state", "# TYPE db_pool_connections gauge"]
+    engines = [("sync", engine), ("async", async_engine.sync_engine)]
+    if READ_DATABASE_URL:
+        engines.append(("replica", read_async_engine.sync_engine))
+    for name, pooled_engine in engines:
+        status = pool_status(pooled_engine)
+        for state in ("checked_out", "idle", "overflow"):
+            lines.append(f'db_pool_connections{{engine="{name}",state="{state}"}} {status[state]}')
+    return lines
+
+register_collector(_pool_metrics)
 
 Base = declarative_base()
 
+# ✅ Read-your-writes: users who committed a write in the last READ_STICKY_SECONDS
+# read from the primary. Tracked per process, keyed on the user_id header.
+READ_STICKY_SECONDS = float(os.getenv("READ_STICKY_SECONDS", "5"))
+# ✅ Replica lag above READ_MAX_LAG_SECONDS sends all reads to the primary; a background
+# task re-checks it every READ_LAG_CHECK_SECONDS, giving up after READ_LAG_TIMEOUT_SECONDS
+READ_MAX_LAG_SECONDS = float(os.getenv("READ_MAX_LAG_SECONDS", "2"))
+READ_LAG_CHECK_SECONDS = float(os.getenv("READ_LAG_CHECK_SECONDS", "5"))
+READ_LAG_TIMEOUT_SECONDS = float(os.getenv("READ_LAG_TIMEOUT_SECONDS", "2"))
+
+recent_writers = TTLCache(maxsize=10000, ttl=READ_STICKY_SECONDS)
+_replica_lag = {"seconds": None}
+_replica_lag_monitor: Optional[asyncio.Task] = None
+
+# Zero while the replica has replayed everything it received, so an idle primary
+# does not read as lag
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+@event.listens_for(SessionLocal, "after_flush")
+def _flag_flush_write(session, flush_context):
+    session.info["wrote"] = True
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _flag_statement_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+@event.listens_for(SessionLocal, "after_commit")
+def _stick_writer_to_primary(session):
+    if session.info.pop("wrote", False) and session.info.get("user_id"):
+        recent_writers.set(session.info["user_id"], True)
+
+async def _query_replica_lag() -> float:
+    async with read_async_engine.connect() as conn:
+        return float((await conn.execute(REPLICA_LAG_QUERY)).scalar())
+
+async def monitor_replica_lag() -> None:
+    """Refresh the replica lag until cancelled; None while the replica cannot be reached."""
+    # Not a request: keep the probe's statements out of any query budget
+    request_query_stats.set(None)
+    while True:
+        try:
+            _replica_lag["seconds"] = await asyncio.wait_for(_query_replica_lag(), READ_LAG_TIMEOUT_SECONDS)
+        except Exception as e:
+            print(f"⚠️ Replica lag check failed: {e!r}")
+            _replica_lag["seconds"] = None
+        await asyncio.sleep(READ_LAG_CHECK_SECONDS)
+
+def start_replica_lag_monitor() -> None:
+    global _replica_lag_monitor
+    if READ_DATABASE_URL and _replica_lag_monitor is None:
+        _replica_lag_monitor = asyncio.get_running_loop().create_task(monitor_replica_lag())
+
+async def stop_replica_lag_monitor() -> None:
+    global _replica_lag_monitor
+    if _replica_lag_monitor is not None:
+        _replica_lag_monitor.cancel()
+        try:
+            await _replica_lag_monitor
+        except asyncio.CancelledError:
+            pass
+        _replica_lag_monitor = None
+
+def replica_lag_seconds() -> Optional[float]:
+    """Last measured replica lag; None until measured or when the replica cannot be reached."""
+    return _replica_lag["seconds"]
+
+def use_replica(user_id: Optional[str]) -> bool:
+    if not READ_DATABASE_URL:
+        return False
+    if user_id and recent_writers.get(user_id) is not MISSING:
+        return False
+    lag = replica_lag_seconds()
+    return lag is not None and lag <= READ_MAX_LAG_SECONDS
+
 # Dependency to get database session
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    db.info["user_id"] = request.headers.get("user-id")
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency to get an async database session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def read_session_factory(user_id: Optional[str]) -> async_sessionmaker:
+    """Session factory for a read: the replica, unless it lags or the user just wrote."""
+    return AsyncReadSessionLocal if use_replica(user_id) else AsyncSessionLocal
+
+# Dependency for read-only routes
+async def get_read_db(request: Request):
+    session_factory = await read_session_factory(request.headers.get("user-id"))
+    async with session_factory() as db:
+        yield db
@@ -0,0 +1,29 @@
+import csv
+import io
+from datetime import datetime
+from typing import Any, Sequence
+import orjson
+
+# ✅ Row encoders for streamed exports; each call renders one batch of rows
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+# asyncpg returns its own UUID subclass, which orjson does not serialize natively
+def ndjson_chunk(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> bytes:
+    return b"".join(orjson.dumps(dict(zip(columns, row)), default=str) + b"\n" for row in rows)
+
+
+def _csv_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def csv_chunk(columns: Sequence[str], rows: Sequence[Sequence[Any]], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
@@ -0,0 +1,43 @@
+import hashlib
+import os
+from typing import Iterable, Optional
+from fastapi import Request, Response
+
+# ✅ Conditional GET helpers: weak ETags from ids/timestamps and per-route Cache-Control
+# (override with CACHE_CONTROL_<ROUTE>, e.g. CACHE_CONTROL_LIST_BUSINESSES="private, max-age=30")
+CACHE_CONTROL_DEFAULT = os.getenv("CACHE_CONTROL_DEFAULT", "private, no-cache")
+
+def cache_control_for(route: str) -> str:
+    return os.getenv(f"CACHE_CONTROL_{route.upper()}", CACHE_CONTROL_DEFAULT)
+
+def make_etag(parts: Iterable) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(str(part).encode())
+        digest.update(b"\x1f")
+    return f'W/"{digest.hexdigest()}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {candidate.strip() for candidate in header.split(",")}
+    # Weak comparison: W/"x" and "x" match
+    return "*" in candidates or etag in candidates or etag[2:] in candidates
+
+def conditional(request: Request, response: Response, etag: str, route: str) -> Optional[Response]:
+    """Set caching headers; return a 304 response when the client's copy is current."""
+    headers = {"ETag": etag, "Cache-Control": cache_control_for(route)}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def row_version(row) -> tuple:
+    """(id, last modification time) of a business/service row."""
+    return (row.id, row.updated_at or row.created_at)
+
+def business_version(business) -> tuple:
+    """Version of a business including its services, matching business_version_query()."""
+    stamps = [service.updated_at or service.created_at for service in business.services]
+    return (*row_version(business), len(stamps), max(stamps) if stamps else None)
@@ -0,0 +1,28 @@
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, raiseload, selectinload
+import models, schemas
+
+# ✅ Loader options per response schema: load exactly the columns and relationships a
+# schema serializes and raise on anything else, so a stray lazy load fails loudly
+# instead of silently turning into an N+1.
+
+def serialized_columns(schema, model):
+    """Mapped column attributes of `model` that `schema` serializes."""
+    column_names = inspect(model).column_attrs.keys()
+    return [getattr(model, name) for name in schema.model_fields if name in column_names]
+
+BOOKING_LOAD = (
+    load_only(*serialized_columns(schemas.Booking, models.Booking), raiseload=True),
+    raiseload("*"),
+)
+
+SERVICE_LOAD = (
+    load_only(*serialized_columns(schemas.Service, models.Service), raiseload=True),
+    raiseload("*"),
+)
+
+BUSINESS_LOAD = (
+    load_only(*serialized_columns(schemas.Business, models.Business), raiseload=True),
+    selectinload(models.Business.services).options(*SERVICE_LOAD),
+    raiseload("*"),
+)
@@ -1,12 +1,16 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from routers import auth, businesses, services, bookings
-from database import engine
-import models
-from chatbot import router as chatbot_router  # ✅ Import chatbot API
+from fastapi.middleware.gzip import GZipMiddleware
+import os
+from routers import auth, businesses, services, bookings, internal
+from database import async_engine, start_replica_lag_monitor, stop_replica_lag_monitor
+from metrics import render_metrics
+from middleware import MetricsMiddleware
 
-# ✅ Ensure tables are created at startup
-models.Base.metadata.create_all(bind=engine)
+# ✅ Schema is managed by Alembic (`alembic upgrade head`), not created at import
+# ✅ Chatbot is optional; its API key and HTTP client are set up on first use
+CHATBOT_ENABLED = os.getenv("CHATBOT_ENABLED", "true").lower() in ("1", "true", "yes")
 
 app = FastAPI(title="NexDoor API", version="1.0.0")
 
@@ -19,12 +23,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ✅ Response compression: brotli when brotli-asgi is installed (gzip fallback), else gzip
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "5"))
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MIN_SIZE, gzip_fallback=True)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE, compresslevel=COMPRESSION_LEVEL)
+
+# ✅ Request latency, in-flight and per-request DB metrics (scraped from /metrics)
+app.add_middleware(MetricsMiddleware)
+
 # ✅ Include routers with versioning
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
 app.include_router(businesses.router, prefix="/api/v1/businesses", tags=["Businesses"])
 app.include_router(services.router, prefix="/api/v1/services", tags=["Services"])
 app.include_router(bookings.router, prefix="/api/v1/bookings", tags=["Bookings"])
-app.include_router(chatbot_router, prefix="/api/v1/chatbot", tags=["Chatbot"]) 
+if CHATBOT_ENABLED:
+    import chatbot
+    app.include_router(chatbot.router, prefix="/api/v1/chatbot", tags=["Chatbot"])
+app.include_router(internal.router, prefix="/internal", include_in_schema=False)
+
+# ✅ Replica lag is measured in the background, never inside a request
+@app.on_event("startup")
+async def start_background_tasks():
+    start_replica_lag_monitor()
+
+# ✅ Release pooled outbound connections on shutdown
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    await stop_replica_lag_monitor()
+    if CHATBOT_ENABLED:
+        await chatbot.close_http_client()
+    await async_engine.dispose()
+
+# ✅ Prometheus text-format metrics
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(internal.require_internal_token)])
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 # ✅ Root API response
 @app.get("/")
@@ -0,0 +1,58 @@
+import time
+from starlette.datastructures import MutableHeaders
+from database import request_query_stats
+from metrics import COUNT_BUCKETS, GaugeFamily, HistogramFamily
+
+# ✅ Per-route request metrics
+REQUEST_SECONDS = HistogramFamily(
+    "http_request_duration_seconds", "HTTP request latency by route", ["method", "route", "status"]
+)
+REQUESTS_IN_FLIGHT = GaugeFamily("http_requests_in_flight", "HTTP requests currently being served")
+REQUEST_DB_QUERIES = HistogramFamily(
+    "http_request_db_queries", "SQL statements executed per request", ["route"], buckets=COUNT_BUCKETS
+)
+REQUEST_DB_SECONDS = HistogramFamily(
+    "http_request_db_seconds", "Time spent in SQL statements per request", ["route"]
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: times each request, counts its SQL statements (see
+    database.request_query_stats) and reports them as X-DB-Query-* headers."""
+
+    def __init__(self, app):
+        self.app = app
+        self.in_flight = REQUESTS_IN_FLIGHT.labels()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = {"count": 0, "seconds": 0.0}
+        token = request_query_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_headers(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Query-Count"] = str(stats["count"])
+                headers["X-DB-Query-Time-Ms"] = f"{stats['seconds'] * 1000:.1f}"
+            await send(message)
+
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.in_flight.dec()
+            request_query_stats.reset(token)
+            # Label by route template, not raw path, to keep cardinality bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            REQUEST_SECONDS.labels(scope["method"], route_path, status_code).observe(elapsed)
+            REQUEST_DB_QUERIES.labels(route_path).observe(stats["count"])
+            REQUEST_DB_SECONDS.labels(route_path).observe(stats["seconds"])
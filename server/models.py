@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    JSON, Boolean, Column, ForeignKey, Integer, String, DateTime, Float, Enum, Text, ARRAY
+    JSON, Boolean, Column, ForeignKey, Index, Integer, String, DateTime, Float, Enum, Text, ARRAY
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -22,16 +22,24 @@ class User(Base):
     maxed_business = Column(Boolean, default=False)
     maxed_services = Column(Boolean, default=False)
     # Relationships
-    businesses = relationship("Business", back_populates="owner", lazy="select")  # Change from dynamic
-    services = relationship("Service", back_populates="owner", lazy="select")  # Change from dynamic
-    bookings = relationship("Booking", back_populates="user", lazy="select")  # Change from dynamic
+    # Child rows are removed by the ON DELETE CASCADE foreign keys, not loaded and deleted one by one
+    businesses = relationship("Business", back_populates="owner", lazy="select", cascade="all, delete", passive_deletes=True)  # Change from dynamic
+    services = relationship("Service", back_populates="owner", lazy="select", cascade="all, delete", passive_deletes=True)  # Change from dynamic
+    bookings = relationship("Booking", back_populates="user", lazy="select", cascade="all, delete", passive_deletes=True)  # Change from dynamic
     # Default empty list for saved businesses
     saved_businesses = Column(ARRAY(UUID(as_uuid=True)), default=[])
 
 class Business(Base):
     __tablename__ = "businesses"
+    __table_args__ = (
+        Index("ix_businesses_created_at_id", "created_at", "id"),
+        # Trigram search indexes (pg_trgm, Alembic migration a4d7f3e2c816)
+        Index("ix_businesses_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_businesses_description_trgm", "description", postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"}),
+        Index("ix_businesses_category_trgm", "category", postgresql_using="gin", postgresql_ops={"category": "gin_trgm_ops"}),
+    )
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, nullable=False)
-    owner_id = Column(String, ForeignKey("users.uid", ondelete="CASCADE"))
+    owner_id = Column(String, ForeignKey("users.uid", ondelete="CASCADE"), index=True)
     name = Column(String, index=True, nullable=False)
     description = Column(Text, nullable=True)
     category = Column(String, nullable=False)
@@ -43,17 +51,35 @@ class Business(Base):
     website = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
     allows_delivery = Column(Boolean, default=False)
+    # WGS84 coordinates; "near me" queries use the earthdistance GiST index
+    # ix_businesses_earth, declared below the class (Alembic migration f2a9c5e7b318)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     # Relationships
     owner = relationship("User", back_populates="businesses")  # Default is fine
-    services = relationship("Service", back_populates="business", lazy="select")  # Change from dynamic
+    services = relationship("Service", back_populates="business", lazy="select", cascade="all, delete", passive_deletes=True)  # Change from dynamic
+
+Index(
+    "ix_businesses_earth",
+    func.ll_to_earth(Business.latitude, Business.longitude),
+    postgresql_using="gist",
+    postgresql_where=Business.latitude.isnot(None) & Business.longitude.isnot(None),
+)
 
 class Service(Base):
     __tablename__ = "services"
+    __table_args__ = (
+        Index("ix_services_business_id_created_at", "business_id", "created_at", "id"),
+        Index("ix_services_created_at_id", "created_at", "id"),
+        # Trigram search indexes (pg_trgm, Alembic migration a4d7f3e2c816)
+        Index("ix_services_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_services_description_trgm", "description", postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"}),
+    )
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     business_id = Column(UUID(as_uuid=True), ForeignKey("businesses.id", ondelete="CASCADE"))
-    owner_id = Column(String, ForeignKey("users.uid", ondelete="CASCADE"))
+    owner_id = Column(String, ForeignKey("users.uid", ondelete="CASCADE"), index=True)
     name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     duration = Column(Integer, nullable=False)
@@ -64,21 +90,28 @@ class Service(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     business = relationship("Business", back_populates="services")  
-    bookings = relationship("Booking", back_populates="service", lazy="select")  
+    bookings = relationship("Booking", back_populates="service", lazy="select", cascade="all, delete", passive_deletes=True)
     owner = relationship("User", back_populates="services")
 
 # ✅ Booking Model
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        Index("ix_bookings_service_id_start_time", "service_id", "start_time"),
+        Index("ix_bookings_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_bookings_created_at_id", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     service_id = Column(UUID(as_uuid=True), ForeignKey("services.id", ondelete="CASCADE"))
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
     start_time = Column(DateTime(timezone=True), nullable=False)
     end_time = Column(DateTime(timezone=True), nullable=False)
-    status = Column(Enum("pending", "confirmed", "cancelled", "completed", name="booking_status"), nullable=False)
+    status = Column(Enum("pending", "confirmed", "cancelled", "completed", name="booking_status"), nullable=False, default="pending")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Overlapping non-cancelled bookings of a service are rejected by the
+    # ex_bookings_no_overlap exclusion constraint (Alembic migration c3f9a7b1e254)
 
     # Relationships
-    service = relationship("Service", back_populates="bookings", lazy="joined")
-    user = relationship("User", back_populates="bookings", lazy="joined")
\ No newline at end of file
+    service = relationship("Service", back_populates="bookings")
+    user = relationship("User", back_populates="bookings")
\ No newline at end of file
@@ -0,0 +1,74 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+from fastapi import HTTPException
+from sqlalchemy import literal, tuple_
+
+# Cursor values are tagged with their type so they decode back to what the DB driver expects.
+# Matched with isinstance: drivers return subclasses (asyncpg's UUID is a uuid.UUID subclass).
+_ENCODERS = {
+    datetime: ("d", lambda v: v.isoformat()),
+    uuid.UUID: ("u", str),
+    float: ("f", float),
+    int: ("i", int),
+    str: ("s", str),
+}
+_DECODERS = {
+    "d": datetime.fromisoformat,
+    "u": uuid.UUID,
+    "f": float,
+    "i": int,
+    "s": str,
+}
+
+
+def _encoder_for(value: Any):
+    for kind, encoder in _ENCODERS.items():
+        if isinstance(value, kind):
+            return encoder
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort-key values of the last row of a page as an opaque cursor."""
+    payload = []
+    for value in values:
+        tag, encode = _encoder_for(value)
+        payload.append([tag, encode(value)])
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[List[Any]]:
+    """Decode a cursor produced by encode_cursor; empty means "first page"."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return [_DECODERS[tag](value) for tag, value in json.loads(raw)]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def apply_keyset(query, sort_key: Sequence[Any], after: Optional[List[Any]], limit: int):
+    """Page a select() by descending sort_key, starting after the decoded cursor.
+
+    The sort-key values are added as extra result columns so the next cursor can be
+    built from the last row.
+    """
+    query = query.add_columns(*sort_key).order_by(*(column.desc() for column in sort_key))
+    if after is not None:
+        if len(after) != len(sort_key):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        bounds = [literal(value, column.type) for value, column in zip(after, sort_key)]
+        query = query.where(tuple_(*sort_key) < tuple_(*bounds))
+    return query.limit(limit)
+
+
+def next_cursor(rows: Sequence[Any], limit: int) -> Optional[str]:
+    """Cursor for the page after ``rows`` (rows from apply_keyset), or None on the last page."""
+    if not rows or len(rows) < limit:
+        return None
+    return encode_cursor(tuple(rows[-1])[1:])
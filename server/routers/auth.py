@@ -1,24 +1,113 @@
 from fastapi import APIRouter, Depends, HTTPException, Header, status
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, event
 from passlib.context import CryptContext
+from datetime import datetime
+import os
+import uuid
 import models, schemas
-from database import get_db
+from database import get_db, get_async_db
+from cache import TTLCache, RedisCache, MISSING
 
 router = APIRouter()
 
 # ✅ Password Hashing Setup
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# ✅ uid -> user column cache (in-process, or shared when USER_CACHE_URL is set)
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_URL = os.getenv("USER_CACHE_URL")
+
+if USER_CACHE_URL:
+    user_cache = RedisCache(USER_CACHE_URL, ttl=USER_CACHE_TTL, prefix="nexdoor:user:")
+else:
+    user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+def user_to_cache(user: models.User) -> dict:
+    """Snapshot a user's columns as JSON-safe values."""
+    return {
+        "id": str(user.id),
+        "uid": user.uid,
+        "email": user.email,
+        "full_name": user.full_name,
+        "phone_number": user.phone_number,
+        "location": user.location,
+        "created_at": user.created_at.isoformat() if user.created_at else None,
+        "is_active": user.is_active,
+        "maxed_business": user.maxed_business,
+        "maxed_services": user.maxed_services,
+        "saved_businesses": [str(b) for b in user.saved_businesses or []],
+    }
+
+def user_from_cache(data: dict) -> models.User:
+    """Rebuild a detached User from a cached snapshot, ready to merge without a SELECT."""
+    user = models.User(
+        **{
+            **data,
+            "id": uuid.UUID(data["id"]),
+            "created_at": datetime.fromisoformat(data["created_at"]) if data["created_at"] else None,
+            "saved_businesses": [uuid.UUID(b) for b in data["saved_businesses"]],
+        }
+    )
+    make_transient_to_detached(user)
+    return user
+
+def invalidate_user(uid: str) -> None:
+    user_cache.delete(uid)
+
+# Any flushed change to a user (e.g. maxed_business/maxed_services) drops its cache entry,
+# and again after commit: a request reading between flush and commit still sees the old
+# committed row and may have re-cached it
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_user_on_write(mapper, connection, target):
+    invalidate_user(target.uid)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("written_user_uids", set()).add(target.uid)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_users_after_commit(session):
+    for uid in session.info.pop("written_user_uids", ()):
+        invalidate_user(uid)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_written_users(session, previous_transaction):
+    session.info.pop("written_user_uids", None)
+
 # ✅ Dependency to Get Current User from Headers
 @router.post("/get_current_user", status_code=200)
 def get_current_user(user_id: str = Header(None), db: Session = Depends(get_db)):
     if not user_id:
         raise HTTPException(status_code=401, detail="Missing user ID in headers")
+    cached = user_cache.get(user_id)
+    if cached is not MISSING:
+        return db.merge(user_from_cache(cached), load=False)
+
     user = db.query(models.User).filter(models.User.uid == user_id).first()
     
     if not user:
         raise HTTPException(status_code=401, detail="Invalid user ID")
+    user_cache.set(user_id, user_to_cache(user))
+    return user
+
+# ✅ Async variant for endpoints running on the async engine
+async def get_current_user_async(user_id: str = Header(None), db: AsyncSession = Depends(get_async_db)):
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Missing user ID in headers")
+    cached = user_cache.get(user_id)
+    if cached is not MISSING:
+        return await db.merge(user_from_cache(cached), load=False)
+
+    result = await db.execute(select(models.User).filter(models.User.uid == user_id).limit(1))
+    user = result.scalars().first()
+
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid user ID")
+    user_cache.set(user_id, user_to_cache(user))
     return user
 
 # ✅ Signup Route (Creates a New User)
@@ -41,6 +130,7 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
 
     db.add(new_user)
     db.commit()
+    invalidate_user(new_user.uid)
     db.refresh(new_user)
 
     return JSONResponse(status_code=201, content={"message": "User registered successfully"})
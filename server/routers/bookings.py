@@ -1,12 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError, IntegrityError
+import uuid
 from typing import List, Optional
-from routers.auth import get_current_user
+from routers.auth import get_current_user, get_current_user_async
 import models, schemas
-from database import get_db
+from database import get_db, get_read_db, query_budget, read_session_factory
+from loaders import BOOKING_LOAD
+from pagination import apply_keyset, decode_cursor, next_cursor
+from export import EXPORT_FORMATS, csv_chunk, ndjson_chunk
+import os
 
 router = APIRouter()
 
+# Postgres SQLSTATEs raised by the bookings constraints (see the c3f9a7b1e254 migration)
+EXCLUSION_VIOLATION = "23P01"
+CHECK_VIOLATION = "23514"
+# Two in-flight overlapping bookings can each wait on the other's exclusion check;
+# Postgres aborts one of them, which has lost the race just like a violation
+DEADLOCK_DETECTED = "40P01"
+
+def booking_error(error: DBAPIError) -> Optional[HTTPException]:
+    """Map a bookings constraint violation to the HTTP error to return, if it is one."""
+    code = getattr(error.orig, "pgcode", None) or getattr(error.orig, "sqlstate", None)
+    if code in (EXCLUSION_VIOLATION, DEADLOCK_DETECTED):
+        return HTTPException(status_code=409, detail="Service is already booked for this time")
+    if code == CHECK_VIOLATION:
+        return HTTPException(status_code=422, detail="end_time must be after start_time")
+    return None
+
+def commit_booking(db: Session) -> None:
+    """Commit, turning overlapping/invalid booking errors into 409/422 responses."""
+    try:
+        db.commit()
+    except DBAPIError as e:
+        db.rollback()
+        http_error = booking_error(e)
+        if http_error is None:
+            raise
+        raise http_error
+
 # ✅ Create Booking
 @router.post("/create_booking", response_model=schemas.Booking, status_code=201)
 def create_booking(
@@ -18,31 +56,226 @@ def create_booking(
     
     db_booking = models.Booking(**booking.dict(), user_id=user.id)
     db.add(db_booking)
-    db.commit()
+    commit_booking(db)
     db.refresh(db_booking)
 
     return db_booking
 
+# ✅ Bulk Create Bookings (one transaction, one multi-row INSERT ... RETURNING)
+MAX_BULK_ITEMS = 1000
+
+def booking_columns():
+    return [getattr(models.Booking, name) for name in schemas.Booking.model_fields]
+
+@router.post("/bulk_create_booking", response_model=List[schemas.BulkBookingResult])
+def bulk_create_bookings(
+    bookings: List[schemas.BookingCreate],
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user)
+):
+    """Creates many bookings for the logged-in user, reporting success or failure per item."""
+    if len(bookings) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_BULK_ITEMS} bookings per request")
+
+    results: List[Optional[schemas.BulkBookingResult]] = [None] * len(bookings)
+    service_ids = {booking.service_id for booking in bookings}
+    known_services = set(
+        db.execute(select(models.Service.id).where(models.Service.id.in_(service_ids))).scalars()
+    ) if service_ids else set()
+
+    rows, row_index = [], {}
+    for index, booking in enumerate(bookings):
+        if booking.end_time <= booking.start_time:
+            results[index] = schemas.BulkBookingResult(index=index, ok=False, error="end_time must be after start_time")
+        elif booking.service_id not in known_services:
+            results[index] = schemas.BulkBookingResult(index=index, ok=False, error="Service not found")
+        else:
+            booking_id = uuid.uuid4()
+            row_index[booking_id] = index
+            rows.append({**booking.model_dump(), "id": booking_id, "user_id": user.id, "status": "pending"})
+
+    if rows:
+        # Rows that overlap an existing booking (or an earlier item) are skipped by the
+        # exclusion constraint instead of aborting the whole statement
+        statement = insert(models.Booking.__table__).on_conflict_do_nothing().returning(*booking_columns())
+        for row in db.execute(statement, rows):
+            index = row_index.pop(row.id)
+            results[index] = schemas.BulkBookingResult(
+                index=index, ok=True, booking=schemas.Booking.model_validate(row)
+            )
+        for index in row_index.values():
+            results[index] = schemas.BulkBookingResult(
+                index=index, ok=False, error="Service is already booked for this time"
+            )
+    db.commit()
+    return results
+
+# ✅ Bulk Update Booking Status (one UPDATE ... RETURNING per target status)
+@router.patch("/bulk_status", response_model=List[schemas.BulkBookingResult])
+def bulk_update_booking_status(
+    updates: List[schemas.BookingStatusUpdate],
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user)
+):
+    """Updates the status of many bookings in one transaction, reporting per item."""
+    if len(updates) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_BULK_ITEMS} updates per request")
+
+    results: List[Optional[schemas.BulkBookingResult]] = [None] * len(updates)
+    latest = {}
+    for index, item in enumerate(updates):
+        if item.booking_id in latest:
+            earlier = latest[item.booking_id]
+            results[earlier] = schemas.BulkBookingResult(
+                index=earlier, ok=False, error="Superseded by a later update of the same booking"
+            )
+        latest[item.booking_id] = index
+
+    by_status = {}
+    for booking_id, index in latest.items():
+        by_status.setdefault(updates[index].status.value, {})[booking_id] = index
+
+    def apply(status_value, ids):
+        statement = (
+            update(models.Booking)
+            .where(models.Booking.id.in_(ids))
+            .values(status=status_value)
+            .returning(*booking_columns())
+            .execution_options(synchronize_session=False)
+        )
+        with db.begin_nested():
+            return db.execute(statement).all()
+
+    for status_value, indexes in by_status.items():
+        try:
+            rows = apply(status_value, list(indexes))
+        except IntegrityError:
+            # Un-cancelling created an overlap; retry one by one so only the conflicting items fail
+            rows = []
+            for booking_id in list(indexes):
+                try:
+                    rows.extend(apply(status_value, [booking_id]))
+                except IntegrityError as e:
+                    index = indexes.pop(booking_id)
+                    http_error = booking_error(e)
+                    results[index] = schemas.BulkBookingResult(
+                        index=index, ok=False, error=http_error.detail if http_error else "Constraint violation"
+                    )
+        for row in rows:
+            index = indexes.pop(row.id)
+            results[index] = schemas.BulkBookingResult(
+                index=index, ok=True, booking=schemas.Booking.model_validate(row)
+            )
+        for index in indexes.values():
+            results[index] = schemas.BulkBookingResult(index=index, ok=False, error="Booking not found")
+
+    db.commit()
+    return results
+
 # ✅ List Bookings (Filtered by User or Service)
-@router.get("/list_booking", response_model=List[schemas.Booking])
-def list_bookings(
+@router.get("/list_booking", response_model=List[schemas.Booking], response_class=ORJSONResponse, dependencies=[Depends(query_budget(2))])
+async def list_bookings(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
     user_id: Optional[str] = None, 
     service_id: Optional[str] = None, 
-    db: Session = Depends(get_db), 
-    user: models.User = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db), 
+    user: models.User = Depends(get_current_user_async)
 ):
-    """Fetches bookings, optionally filtered by user or service."""
+    """Fetches bookings, optionally filtered by user or service.
+
+    Passing `cursor` (empty for the first page) pages by (created_at, id) instead of
+    skip/limit; the next page's cursor is returned in the X-Next-Cursor header.
+    """
+    after = decode_cursor(cursor)
     
-    query = db.query(models.Booking)
+    query = select(models.Booking).options(*BOOKING_LOAD)
     if user_id:
         query = query.filter(models.Booking.user_id == user_id)
     if service_id:
         query = query.filter(models.Booking.service_id == service_id)
 
-    bookings = query.offset(skip).limit(limit).all()
-    return bookings
+    if cursor is None:
+        result = await db.execute(query.offset(skip).limit(limit))
+        bookings = result.scalars().all()
+        return bookings
+
+    sort_key = [models.Booking.created_at, models.Booking.id]
+    rows = (await db.execute(apply_keyset(query, sort_key, after, limit))).all()
+    next_page = next_cursor(rows, limit)
+    if next_page:
+        response.headers["X-Next-Cursor"] = next_page
+    return [row[0] for row in rows]
+
+# ✅ Export bookings of the owner's services, streamed with a server-side cursor
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_COLUMNS = [
+    models.Booking.id,
+    models.Booking.service_id,
+    models.Booking.user_id,
+    models.Booking.start_time,
+    models.Booking.end_time,
+    models.Booking.status,
+    models.Booking.created_at,
+]
+
+@router.get("/export")
+async def export_bookings(
+    request: Request,
+    format: str = "ndjson",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    service_id: Optional[uuid.UUID] = None,
+    user: models.User = Depends(get_current_user_async)
+):
+    """Streams every booking of the caller's services (optionally by service and
+    start_time range) as NDJSON or CSV, ordered by service and start time.
+
+    Rows are fetched EXPORT_BATCH_SIZE at a time as plain tuples, so memory stays
+    flat however many rows are exported.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+
+    owned_services = select(models.Service.id).where(models.Service.owner_id == user.uid)
+    query = (
+        select(*EXPORT_COLUMNS)
+        .where(models.Booking.service_id.in_(owned_services))
+        .order_by(models.Booking.service_id, models.Booking.start_time)  # matches ix_bookings_service_id_start_time
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    if service_id:
+        query = query.where(models.Booking.service_id == service_id)
+    if start:
+        query = query.where(models.Booking.start_time >= start)
+    if end:
+        query = query.where(models.Booking.start_time < end)
+
+    columns = [column.key for column in EXPORT_COLUMNS]
+    # Request-scoped sessions are closed before a streamed body runs, so the
+    # generator opens (and closes) its own
+    session_factory = await read_session_factory(request.headers.get("user-id"))
+
+    async def rows():
+        header = True
+        async with session_factory() as db:
+            result = await db.stream(query)
+            async for batch in result.partitions():
+                if format == "csv":
+                    yield csv_chunk(columns, batch, header=header)
+                    header = False
+                else:
+                    yield ndjson_chunk(columns, batch)
+        if header and format == "csv":
+            yield csv_chunk(columns, [], header=True)
+
+    return StreamingResponse(
+        rows(),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="bookings.{format}"'},
+    )
 
 # ✅ Get Booking by ID
 @router.get("/get_booking/{booking_id}", response_model=schemas.Booking)
@@ -78,7 +311,7 @@ def update_booking(
     for key, value in booking_update.dict().items():
         setattr(db_booking, key, value)
 
-    db.commit()
+    commit_booking(db)
     db.refresh(db_booking)
     return db_booking
 
@@ -98,7 +331,7 @@ def update_booking_status(
         raise HTTPException(status_code=404, detail="Booking not found")
 
     booking.status = status.value  # If BookingStatus is an Enum
-    db.commit()
+    commit_booking(db)
     db.refresh(booking)
 
     return booking
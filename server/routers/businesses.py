@@ -1,13 +1,20 @@
 from datetime import datetime
 import traceback
 import uuid
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, or_
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import cast, column, delete, func, insert, select, update, values
 from typing import List, Optional
-from routers.auth import get_current_user
+from routers.auth import get_current_user, get_current_user_async
 import models, schemas
-from database import get_db
+from database import get_db, get_read_db, query_budget
+from loaders import BUSINESS_LOAD
+from search import business_proximity, business_search, nearest_businesses
+from cache import bump_version
+from pagination import apply_keyset, decode_cursor, next_cursor
+from http_cache import business_version, conditional, make_etag
 
 router = APIRouter()
 
@@ -22,96 +29,239 @@ def create_business(
         if user.maxed_business:
             raise HTTPException(status_code=403, detail="Not authorized to create a business")
 
-        # ✅ Explicitly generate UUID before adding to DB
+        # ✅ Business and services go in one transaction; IDs and timestamps are
+        # generated here so the response needs no refresh round-trip
+        now = datetime.now()
         business_id = uuid.uuid4()
-
-        # Create the business
-        db_business = models.Business(
-            id=business_id,  # ✅ Explicitly set ID
+        business_row = {
             **business.model_dump(exclude={"services"}),
-            owner_id=user.uid,
-            created_at=datetime.now(),
-            updated_at=datetime.now(),
-        )
-        db.add(db_business)
-        db.commit()  # ✅ Ensure it's stored in DB
-        db.refresh(db_business)  # ✅ Ensure ID is assigned
-
-        user.maxed_business = True
-
-        # ✅ Now business_id is guaranteed to exist
-        for service_data in business.services:
-            db_service = models.Service(
+            "id": business_id,
+            "owner_id": user.uid,
+            "is_active": True,
+            "created_at": now,
+            "updated_at": now,
+        }
+        service_rows = [
+            {
                 **service_data.model_dump(),
-                owner_id=user.uid,
-                business_id=business_id,  # ✅ Now it's guaranteed to be set
-                created_at=datetime.now(),
-                updated_at=datetime.now(),
-            )
-            db.add(db_service)
+                "id": uuid.uuid4(),
+                "owner_id": user.uid,
+                "business_id": business_id,
+                "is_active": True,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for service_data in business.services
+        ]
 
-        db.commit()
+        db.execute(insert(models.Business), [business_row])
+        if service_rows:
+            db.execute(insert(models.Service), service_rows)  # single multi-row INSERT
+        user.maxed_business = True
         user.maxed_services = True
-        return db_business
+        db.commit()
+        bump_version("businesses")
+        return schemas.Business(**business_row, services=service_rows)
 
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail={"message": "Failed to create business"})
 
-# ✅ List Businesses (With Optional Search)
-@router.get("/list_businesses", response_model=List[schemas.Business])
-def list_businesses(
+# ✅ List Businesses (With Optional Search or Proximity)
+MAX_RADIUS_KM = 500
+
+def nearby_query(query, lat: float, lng: float, radius_km: float, skip: int, limit: int, filtered: bool = False):
+    """Page of `query`'s businesses within `radius_km` of a point, nearest first, with
+    their distance in metres as an extra column."""
+    match, nearest, distance = business_proximity(lat, lng, radius_km)
+    if not filtered:
+        # Only the nearest skip + limit businesses can make the page: take them through
+        # the kNN index and keep those within the radius
+        candidates = nearest_businesses(lat, lng, skip + limit)
+        query = query.join(candidates, candidates.c.id == models.Business.id)
+        match, nearest = distance <= radius_km * 1000, candidates.c.nearest
+    return query.add_columns(distance).filter(match).order_by(nearest, models.Business.id).offset(skip).limit(limit)
+
+@router.get("/list_businesses", response_model=List[schemas.Business], response_class=ORJSONResponse, dependencies=[Depends(query_budget(3))])
+async def list_businesses(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: float = Query(10, gt=0, le=MAX_RADIUS_KM),
+    db: AsyncSession = Depends(get_read_db),
+    user: models.User = Depends(get_current_user_async)
 ):
+    # Passing `cursor` (empty for the first page) switches to keyset pagination;
+    # the next page's cursor is returned in the X-Next-Cursor header.
+    # Passing `lat` and `lng` returns businesses within `radius_km`, nearest first
+    # (skip/limit paging), with `distance_km` set.
+    near = lat is not None or lng is not None
+    if near and (lat is None or lng is None):
+        raise HTTPException(status_code=422, detail="lat and lng must be given together")
+    if near and cursor is not None:
+        raise HTTPException(status_code=400, detail="cursor paging is not supported with lat/lng")
+    after = decode_cursor(cursor)
     try:
-        query = db.query(models.Business).options(joinedload(models.Business.services))
+        # services come from one batched selectin query instead of multiplying rows
+        query = select(models.Business).options(*BUSINESS_LOAD)
+        sort_key = [models.Business.created_at, models.Business.id]
 
         if search:
             search = search.strip()
-            query = query.filter(
-                or_(
-                    func.similarity(models.Business.name, search) > 0.3,
-                    func.similarity(models.Business.description, search) > 0.3,
-                    func.similarity(models.Business.category, search) > 0.3
-                )
-            ).order_by(func.similarity(models.Business.name, search).desc())
+            match, rank = business_search(search)
+            query = query.filter(match)
+            sort_key = [rank, models.Business.id]
+            if cursor is None and not near:
+                query = query.order_by(rank.desc())
 
-        return query.offset(skip).limit(limit).all()
+        if near:
+            rows = (await db.execute(nearby_query(query, lat, lng, radius_km, skip, limit, filtered=bool(search)))).all()
+            businesses = []
+            for business, meters in rows:
+                business.distance_km = round(meters / 1000, 3)
+                businesses.append(business)
+        elif cursor is None:
+            result = await db.execute(query.offset(skip).limit(limit))
+            businesses = result.scalars().all()
+        else:
+            rows = (await db.execute(apply_keyset(query, sort_key, after, limit))).all()
+            businesses = [row[0] for row in rows]
+            next_page = next_cursor(rows, limit)
+            if next_page:
+                response.headers["X-Next-Cursor"] = next_page
+
+        etag = make_etag(business_version(business) for business in businesses)
+        return conditional(request, response, etag, "list_businesses") or businesses
 
     except Exception as e:
         raise HTTPException(status_code=500, detail={ "message": "Failed to list businesses"})
 
 # ✅ Get Business by ID
-@router.get("/get_business/{business_id}", response_model=schemas.Business)
-@router.get("/get_business", response_model=schemas.Business)
-def get_business(
+def business_version_query():
+    """Cheap version check for a business: its timestamps plus its services' count and latest change."""
+    return (
+        select(
+            models.Business.id,
+            models.Business.updated_at,
+            models.Business.created_at,
+            func.count(models.Service.id),
+            func.max(func.coalesce(models.Service.updated_at, models.Service.created_at)),
+        )
+        .outerjoin(models.Service, models.Service.business_id == models.Business.id)
+        .group_by(models.Business.id)
+    )
+
+@router.get("/get_business/{business_id}", response_model=schemas.Business, dependencies=[Depends(query_budget(4))])
+@router.get("/get_business", response_model=schemas.Business, dependencies=[Depends(query_budget(4))])
+async def get_business(
+    request: Request,
+    response: Response,
     business_id: str = None,  
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    user: models.User = Depends(get_current_user_async)
 ):
     try:
         if business_id:
-            business = db.query(models.Business).filter(models.Business.id == business_id).first()
-            if not business:
-                raise HTTPException(status_code=404, detail="Business not found")
+            condition = models.Business.id == business_id
         else:
-            business = db.query(models.Business).filter(models.Business.owner_id == user.uid).first()
-            if not business:
-                raise HTTPException(status_code=404, detail="No business found for the current user")
+            condition = models.Business.owner_id == user.uid
+
+        # Revalidation: answer 304 from the version row without loading the business
+        if request.headers.get("if-none-match"):
+            version = (await db.execute(business_version_query().filter(condition).limit(1))).first()
+            if version:
+                business_id_, updated_at, created_at, count, latest = version
+                etag = make_etag([(business_id_, updated_at or created_at, count, latest)])
+                not_modified = conditional(request, response, etag, "get_business")
+                if not_modified:
+                    return not_modified
+
+        query = select(models.Business).options(*BUSINESS_LOAD)
+        result = await db.execute(query.filter(condition).limit(1))
+        business = result.scalars().first()
+        if not business:
+            if business_id:
+                raise HTTPException(status_code=404, detail="Business not found")
+            raise HTTPException(status_code=404, detail="No business found for the current user")
 
-        return business
+        return conditional(request, response, make_etag([business_version(business)]), "get_business") or business
 
     except Exception as e:
         raise HTTPException(status_code=500, detail={ "message": "Failed to get business"})
 
+# ✅ Reconcile a business's services against the payload in a fixed number of statements
+SERVICE_FIELDS = list(schemas.ServiceBase.model_fields)
+SERVICE_UPDATE_COLUMNS = ["id", *SERVICE_FIELDS, "updated_at"]
+
+def update_services(db: Session, rows: List[dict]) -> None:
+    """Update many services in one UPDATE ... FROM (VALUES ...) statement.
+
+    Rows carry every column in SERVICE_UPDATE_COLUMNS, so one statement covers any mix
+    of changes. (An ORM bulk UPDATE by primary key is an executemany: one round trip
+    per row on psycopg2.)
+    """
+    table = models.Service.__table__
+    changed = values(
+        *(column(name, table.c[name].type) for name in SERVICE_UPDATE_COLUMNS),
+        name="changed",
+    ).data([tuple(row[name] for name in SERVICE_UPDATE_COLUMNS) for row in rows])
+    db.execute(
+        update(table)
+        .where(table.c.id == changed.c.id)
+        # VALUES columns are typed from their literals (e.g. JSON arrives as text), so cast back
+        .values({name: cast(changed.c[name], table.c[name].type) for name in SERVICE_UPDATE_COLUMNS[1:]})
+    )
+
+def reconcile_services(db: Session, db_business: models.Business, user: models.User, services: List[dict]) -> None:
+    """Insert new services, update changed columns of existing ones and delete the rest."""
+    now = datetime.now()
+    existing = {
+        row.id: row
+        for row in db.execute(
+            select(models.Service.id, *(getattr(models.Service, field) for field in SERVICE_FIELDS))
+            .where(models.Service.business_id == db_business.id)
+        )
+    }
+
+    inserts, updates, kept = [], [], set()
+    for service_data in services:
+        service_id = service_data.pop("id", None)
+        current = existing.get(service_id)
+        if current is None:
+            # Unknown ids (or other businesses' services) are created as new services
+            inserts.append({
+                **schemas.ServiceCreate(**service_data).model_dump(),
+                "id": uuid.uuid4(),
+                "owner_id": user.uid,
+                "business_id": db_business.id,
+                "is_active": True,
+                "created_at": now,
+                "updated_at": now,
+            })
+            continue
+        kept.add(service_id)
+        if any(getattr(current, key) != value for key, value in service_data.items()):
+            updates.append({**current._asdict(), **service_data, "updated_at": now})
+
+    deletes = [service_id for service_id in existing if service_id not in kept]
+    if inserts:
+        db.execute(insert(models.Service), inserts)
+    if updates:
+        update_services(db, updates)
+    if deletes:
+        db.execute(delete(models.Service).where(models.Service.id.in_(deletes)))
+
 # ✅ Update Business (Only Owner Can Update)
-@router.post("/update_business", response_model=schemas.Business)
+@router.post("/update_business", response_model=schemas.Business, dependencies=[Depends(query_budget(10))])
 def update_business(
-    business_update: schemas.BusinessCreate,
+    business_update: schemas.BusinessUpdate,
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user)
 ):
@@ -122,7 +272,7 @@ def update_business(
         if not db_business:
             raise HTTPException(
                 status_code=404, 
-                detail=f"Business not found - user.uid: {user.uid}, owner_id: {business_update.owner_id}"
+                detail=f"Business not found - user.uid: {user.uid}"
             )
 
         # Authorization check
@@ -131,32 +281,16 @@ def update_business(
 
         # Update fields dynamically
         business_data=business_update.model_dump(exclude_unset=True)
+        services = business_data.pop("services", None)
         for key, value in business_data.items():
             if hasattr(db_business, key):
-                attr = getattr(db_business, key)
-
-                # Handling relationships like `services`
-                if key == "services" and isinstance(value, list):
-                    new_services = []
-                    for service_data in value:
-                        if "id" in service_data:  
-                            # Existing service, fetch and update
-                            service = db.query(models.Service).filter_by(id=service_data["id"]).first()
-                            if service:
-                                for s_key, s_value in service_data.items():
-                                    setattr(service, s_key, s_value)
-                            new_services.append(service)
-                        else:
-                            # New service, create an instance
-                            new_service = models.Service(**service_data)
-                            db.add(new_service)
-                            db.flush()  # Ensure ID is assigned before appending
-                            new_services.append(new_service)
-
-                    setattr(db_business, key, new_services)  # Assign updated service list
-                else:
-                    setattr(db_business, key, value)
+                setattr(db_business, key, value)
+        if services is not None:
+            reconcile_services(db, db_business, user, services)
+            # Keep the identity map from serving the pre-reconcile collection
+            db.expire(db_business, ["services"])
         db.commit()
+        bump_version("businesses")
         db.refresh(db_business)
         return db_business
 
@@ -177,17 +311,29 @@ def delete_business(
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user)
 ):
-    try:
-        """Allows the business owner to delete their business."""
-        business = db.query(models.Business).filter(models.Business.id == business_id).first()
+    """Allows the business owner to delete their business.
 
-        if not business:
-            raise HTTPException(status_code=404, detail="Business not found")
-
-        if business.owner_id != user.id:
+    One DELETE checks ownership; its services and their bookings go with it via
+    the ON DELETE CASCADE foreign keys.
+    """
+    try:
+        result = db.execute(
+            delete(models.Business)
+            .where(models.Business.id == business_id, models.Business.owner_id == user.uid)
+        )
+        if result.rowcount == 0:
+            exists = db.execute(select(models.Business.id).where(models.Business.id == business_id)).first()
+            if not exists:
+                raise HTTPException(status_code=404, detail="Business not found")
             raise HTTPException(status_code=403, detail="Not authorized to delete this business")
 
-        db.delete(business)
+        # Owners have at most one business, so its services were all of theirs; the
+        # flags go in the same transaction and their flush invalidates the cached user
+        user.maxed_business = False
+        user.maxed_services = False
         db.commit()
+        bump_version("businesses")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail={ "message": "Failed to delete business"})
\ No newline at end of file
@@ -0,0 +1,41 @@
+import os
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from database import engine, async_engine, read_async_engine, pool_status, pool_wait_seconds, statement_seconds, POOL_SETTINGS, READ_DATABASE_URL
+
+# ✅ Operational endpoints (/internal/*, /metrics) require `Authorization: Bearer <token>`
+# matching INTERNAL_API_TOKEN; without the setting they are not served at all
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN")
+
+def require_internal_token(authorization: Optional[str] = Header(None)):
+    if not INTERNAL_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), INTERNAL_API_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid internal API token", headers={"WWW-Authenticate": "Bearer"})
+
+router = APIRouter(dependencies=[Depends(require_internal_token)])
+
+# ✅ Connection pool usage and wait-time histograms (for sizing the pool)
+@router.get("/db_pool")
+def db_pool_metrics():
+    pools = {
+        "sync": {
+            **pool_status(engine),
+            "wait_seconds": pool_wait_seconds.labels("sync").snapshot(),
+            "statement_seconds": statement_seconds.labels("sync").snapshot(),
+        },
+        "async": {
+            **pool_status(async_engine.sync_engine),
+            "wait_seconds": pool_wait_seconds.labels("async").snapshot(),
+            "statement_seconds": statement_seconds.labels("async").snapshot(),
+        },
+    }
+    if READ_DATABASE_URL:
+        pools["replica"] = {
+            **pool_status(read_async_engine.sync_engine),
+            "wait_seconds": pool_wait_seconds.labels("replica").snapshot(),
+            "statement_seconds": statement_seconds.labels("replica").snapshot(),
+        }
+    return {"settings": POOL_SETTINGS, "pools": pools}
@@ -1,12 +1,21 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import traceback
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session, raiseload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, delete, func, or_, select
 from typing import List, Optional
-from routers.auth import get_current_user
+from routers.auth import get_current_user, get_current_user_async
 import models, schemas
-from database import get_db
+from database import get_db, get_read_db, query_budget
+from loaders import SERVICE_LOAD
+from search import service_search
+from availability import BusyIndex, as_tuple, free_slots, parse_windows
+from cache import bump_version
+from pagination import apply_keyset, decode_cursor, next_cursor
+from http_cache import conditional, make_etag, row_version
 
 router = APIRouter()
 
@@ -33,6 +42,7 @@ def create_service(
         )
         db.add(db_service)
         db.commit()
+        bump_version("businesses")
         db.refresh(db_service)
         return db_service
 
@@ -40,59 +50,182 @@ def create_service(
         raise HTTPException(status_code=500, detail={ "message": "Failed to create service"})
 
 # ✅ List Services (With Filters)
-@router.get("/list_services", response_model=List[schemas.Service])
-def list_services(
+@router.get("/list_services", response_model=List[schemas.Service], response_class=ORJSONResponse, dependencies=[Depends(query_budget(2))])
+async def list_services(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     business_id: Optional[str] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    user: models.User = Depends(get_current_user_async)
 ):
+    # Passing `cursor` (empty for the first page) switches to keyset pagination;
+    # the next page's cursor is returned in the X-Next-Cursor header.
+    after = decode_cursor(cursor)
     try:
-        query = db.query(models.Service)
+        query = select(models.Service).options(*SERVICE_LOAD)
+        sort_key = [models.Service.created_at, models.Service.id]
 
         if business_id:
             query = query.filter(models.Service.business_id == business_id)
 
         if search:
             search = search.strip()
-            query = query.filter(
-                or_(
-                    func.similarity(models.Service.name, search) > 0.3,
-                    func.similarity(models.Service.description, search) > 0.3
-                )
-            ).order_by(func.similarity(models.Service.name, search).desc())
+            match, rank = service_search(search)
+            query = query.filter(match)
+            sort_key = [rank, models.Service.id]
+            if cursor is None:
+                query = query.order_by(rank.desc())
 
-        return query.offset(skip).limit(limit).all()
+        if cursor is None:
+            result = await db.execute(query.offset(skip).limit(limit))
+            services = result.scalars().all()
+        else:
+            rows = (await db.execute(apply_keyset(query, sort_key, after, limit))).all()
+            services = [row[0] for row in rows]
+            next_page = next_cursor(rows, limit)
+            if next_page:
+                response.headers["X-Next-Cursor"] = next_page
+
+        etag = make_etag(row_version(service) for service in services)
+        return conditional(request, response, etag, "list_services") or services
 
     except Exception as e:
         raise HTTPException(status_code=500, detail={ "message": "Failed to list services"})
 
 # ✅ Get Service by ID
-@router.get("/get_service/{service_id}")
-@router.get("/get_service")  # Return a list of services
-def get_service(
+@router.get("/get_service/{service_id}", dependencies=[Depends(query_budget(3))])
+@router.get("/get_service", dependencies=[Depends(query_budget(2))])  # Return a list of services
+async def get_service(
+    request: Request,
+    response: Response,
     service_id: Optional[str] = None, 
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    user: models.User = Depends(get_current_user_async)
 ):
     try:
         if service_id:
-            service = db.query(models.Service).filter(models.Service.id == service_id).first()
+            # Revalidation: answer 304 from (id, timestamps) without loading the service
+            if request.headers.get("if-none-match"):
+                version = (await db.execute(
+                    select(models.Service.id, models.Service.updated_at, models.Service.created_at)
+                    .filter(models.Service.id == service_id)
+                )).first()
+                if version:
+                    not_modified = conditional(request, response, make_etag([row_version(version)]), "get_service")
+                    if not_modified:
+                        return not_modified
+
+            result = await db.execute(select(models.Service).options(raiseload("*")).filter(models.Service.id == service_id).limit(1))
+            service = result.scalars().first()
             if not service:
                 raise HTTPException(status_code=404, detail="Service not found")
-            return service
+            return conditional(request, response, make_etag([row_version(service)]), "get_service") or service
 
-        services = db.query(models.Service).filter(models.Service.owner_id == user.uid).all()  # Fixed here
+        result = await db.execute(select(models.Service).options(raiseload("*")).filter(models.Service.owner_id == user.uid))  # Fixed here
+        services = result.scalars().all()
 
         if not services:
             raise HTTPException(status_code=404, detail="No services found for the current user")
 
-        return services
+        etag = make_etag(row_version(service) for service in services)
+        return conditional(request, response, etag, "get_service") or services
     except Exception as e:
         raise HTTPException(status_code=500, detail={"message": "Failed to get service", "error": str(e)})
 
+# ✅ Free Slots for a Service over a Date Range
+MAX_AVAILABILITY_DAYS = 62
+
+def busy_blocks_query(service_id, start: datetime, end: datetime, min_gap: timedelta):
+    """Live bookings in [start, end) as busy blocks ordered by start, merging neighbours
+    separated by less than `min_gap`.
+
+    No slot fits in such a gap, so the slots come out the same while a densely
+    booked month returns a handful of rows instead of one per booking.
+    """
+    # Live bookings never overlap (exclusion constraint): the gap before a booking runs
+    # from the previous one's end, the gap after it to the next one's start
+    ordered = {"order_by": models.Booking.start_time}
+    previous_end = func.lag(models.Booking.end_time).over(**ordered)
+    next_start = func.lead(models.Booking.start_time).over(**ordered)
+    bookings = (
+        select(
+            models.Booking.start_time,
+            models.Booking.end_time,
+            or_(previous_end.is_(None), models.Booking.start_time - previous_end >= min_gap).label("opens"),
+            or_(next_start.is_(None), next_start - models.Booking.end_time >= min_gap).label("closes"),
+        )
+        .where(
+            models.Booking.service_id == service_id,
+            models.Booking.status != "cancelled",
+            models.Booking.start_time < end,
+            models.Booking.end_time > start,
+        )
+        .subquery()
+    )
+    # Only bookings at a block's edges remain; an opening one that does not also close
+    # its block is followed by the one that does
+    edges = (
+        select(
+            bookings.c.start_time,
+            bookings.c.opens,
+            case((bookings.c.closes, bookings.c.end_time), else_=func.lead(bookings.c.end_time).over(order_by=bookings.c.start_time)).label("block_end"),
+        )
+        .where(or_(bookings.c.opens, bookings.c.closes))
+        .subquery()
+    )
+    return select(edges.c.start_time, edges.c.block_end).where(edges.c.opens).order_by(edges.c.start_time)
+
+@router.get("/{service_id}/availability", response_model=schemas.ServiceAvailability, dependencies=[Depends(query_budget(3))])
+async def get_service_availability(
+    service_id: str,
+    start: datetime,
+    end: datetime,
+    tz: str = "UTC",
+    step: int = 0,
+    db: AsyncSession = Depends(get_read_db),
+    user: models.User = Depends(get_current_user_async)
+):
+    """Lists bookable slots: the service's weekly windows (wall-clock in `tz`) minus existing bookings."""
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=422, detail="Unknown time zone")
+    start = start if start.tzinfo else start.replace(tzinfo=zone)
+    end = end if end.tzinfo else end.replace(tzinfo=zone)
+    if end <= start or end - start > timedelta(days=MAX_AVAILABILITY_DAYS):
+        raise HTTPException(status_code=422, detail=f"Range must be positive and at most {MAX_AVAILABILITY_DAYS} days")
+    if step < 0:
+        raise HTTPException(status_code=422, detail="step must be positive")
+
+    result = await db.execute(
+        select(models.Service.duration, models.Service.available_days, models.Service.available_hours)
+        .where(models.Service.id == service_id)
+    )
+    service = result.first()
+    if service is None:
+        raise HTTPException(status_code=404, detail="Service not found")
+    if service.duration <= 0:
+        # Rows created before the schema required a positive duration
+        raise HTTPException(status_code=422, detail="Service has an invalid duration")
+    try:
+        windows = parse_windows(as_tuple(service.available_days), as_tuple(service.available_hours))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Service has invalid availability data")
+
+    blocks = await db.execute(busy_blocks_query(service_id, start, end, timedelta(minutes=service.duration)))
+    busy = BusyIndex(blocks.all(), presorted=True)
+    slots = free_slots(windows, service.duration, busy, start, end, zone, step)
+    return {
+        "service_id": service_id,
+        "start": start,
+        "end": end,
+        "slots": [{"start": slot_start, "end": slot_end} for slot_start, slot_end in slots],
+    }
+
 # ✅ Update Service (Only Business Owners)
 @router.put("/update_service/")
 def update_service(
@@ -114,6 +247,7 @@ def update_service(
             setattr(db_service, key, value)
 
         db.commit()
+        bump_version("businesses")
         db.refresh(db_service)
         return db_service
 
@@ -128,20 +262,33 @@ def delete_service(
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user)
 ):
-   try:
-        """Allows business owners to delete their services."""
-        service = db.query(models.Service).filter(models.Service.id == service_id).first()
-
-        if not service:
-            raise HTTPException(status_code=404, detail="Service not found")
+    """Allows business owners to delete their services.
 
-        # Ensure the user owns the business that created the service
-        business = db.query(models.Business).filter(models.Business.id == service.business_id, models.Business.owner_id == user.id).first()
-        if not business:
+    One DELETE checks that the user owns the service's business; its bookings go
+    with it via the ON DELETE CASCADE foreign key.
+    """
+    try:
+        owned_business = (
+            select(models.Business.id)
+            .where(models.Business.id == models.Service.business_id, models.Business.owner_id == user.uid)
+            .exists()
+        )
+        result = db.execute(
+            delete(models.Service).where(models.Service.id == service_id, owned_business)
+        )
+        if result.rowcount == 0:
+            exists = db.execute(select(models.Service.id).where(models.Service.id == service_id)).first()
+            if not exists:
+                raise HTTPException(status_code=404, detail="Service not found")
             raise HTTPException(status_code=403, detail="Not authorized to delete this service")
 
-        db.delete(service)
+        # The owner may add a service again once none are left
+        remaining = db.execute(select(models.Service.id).where(models.Service.owner_id == user.uid).limit(1)).first()
+        user.maxed_services = remaining is not None
         db.commit()
-   except Exception as e:
-        print("Error: "+e)
+        bump_version("businesses")
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error: {e}")
         raise HTTPException(status_code=500, detail={ "message": "Failed to delete service"})
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, UUID4, Field
+from pydantic import BaseModel, EmailStr, UUID4, Field, field_validator
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
@@ -28,6 +28,10 @@ class ServiceBase(BaseModel):
     available_days: List[str] = Field(default_factory=list)  # List of days (e.g., ["Monday", "Tuesday"])
     available_hours: List[str] = Field(default_factory=list)  # List of hours (e.g., ["09:00-12:00", "14:00-18:00"])
 
+# Input only: rows saved before this check may still hold a bad duration and must stay readable
+class ServiceCreate(ServiceBase):
+    duration: int = Field(..., gt=0)  # In minutes
+
 # ✅ Business Schemas
 class BusinessBase(BaseModel):
     name: str
@@ -40,6 +44,8 @@ class BusinessBase(BaseModel):
     email: Optional[EmailStr] = None
     website: Optional[str] = None
     allows_delivery: bool = False
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 class Service(ServiceBase):
     id: UUID4
@@ -52,7 +58,18 @@ class Service(ServiceBase):
         from_attributes = True
         
 class BusinessCreate(BusinessBase):
-    services: List[ServiceBase]
+    services: List[ServiceCreate]
+
+class ServiceUpdate(ServiceCreate):
+    id: Optional[UUID4] = None  # Existing service to update; empty/missing means a new one
+
+    @field_validator("id", mode="before")
+    @classmethod
+    def empty_id_is_new(cls, value):
+        return value or None
+
+class BusinessUpdate(BusinessBase):
+    services: List[ServiceUpdate] = []
 class Business(BusinessBase):
     id: UUID4
     owner_id: str
@@ -60,12 +77,21 @@ class Business(BusinessBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     services: List[Service] = []  
+    distance_km: Optional[float] = None  # Set by list_businesses in lat/lng mode
 
     class Config:
         from_attributes = True
 
-class ServiceCreate(ServiceBase):
-    pass
+# ✅ Availability Schemas
+class AvailabilitySlot(BaseModel):
+    start: datetime
+    end: datetime
+
+class ServiceAvailability(BaseModel):
+    service_id: UUID4
+    start: datetime
+    end: datetime
+    slots: List[AvailabilitySlot]
 
 # ✅ Booking Status Enum
 class BookingStatus(str, Enum):
@@ -91,3 +117,14 @@ class Booking(BookingBase):
 
     class Config:
         from_attributes = True
+
+# ✅ Bulk Booking Schemas
+class BookingStatusUpdate(BaseModel):
+    booking_id: UUID4
+    status: BookingStatus
+
+class BulkBookingResult(BaseModel):
+    index: int  # Position of the item in the request
+    ok: bool
+    booking: Optional[Booking] = None
+    error: Optional[str] = None
\ No newline at end of file
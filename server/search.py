@@ -0,0 +1,58 @@
+from sqlalchemy import Float, and_, func, or_, select
+import models
+
+# ✅ Trigram search: `%` (similarity >= pg_trgm.similarity_threshold, 0.3 by default)
+# can use the GIN gin_trgm_ops indexes; the rank is one computed column.
+
+def business_search(search: str):
+    """Return (filter clause, rank expression) for a business text search."""
+    columns = (models.Business.name, models.Business.description, models.Business.category)
+    match = or_(*(column.op("%")(search) for column in columns))
+    rank = func.greatest(*(func.similarity(column, search) for column in columns), type_=Float).label("rank")
+    return match, rank
+
+def service_search(search: str):
+    """Return (filter clause, rank expression) for a service text search."""
+    columns = (models.Service.name, models.Service.description)
+    match = or_(*(column.op("%")(search) for column in columns))
+    rank = func.greatest(*(func.similarity(column, search) for column in columns), type_=Float).label("rank")
+    return match, rank
+
+# ✅ Proximity search with cube/earthdistance: earth_box() @> prefilters through the
+# GiST index on ll_to_earth(latitude, longitude); `<->` orders nearest-first (kNN)
+# through the same index, and earth_distance() is the great-circle distance in metres.
+
+def business_proximity(latitude: float, longitude: float, radius_km: float):
+    """Return (filter clause, ordering expression, distance in metres) around a point."""
+    center = func.ll_to_earth(latitude, longitude)
+    point = func.ll_to_earth(models.Business.latitude, models.Business.longitude)
+    radius_m = radius_km * 1000
+    distance = func.earth_distance(center, point, type_=Float).label("distance")
+    match = and_(
+        models.Business.latitude.isnot(None),
+        models.Business.longitude.isnot(None),
+        func.earth_box(center, radius_m).bool_op("@>")(point),
+        func.earth_distance(center, point) <= radius_m,
+    )
+    nearest = point.op("<->", return_type=Float)(center)
+    return match, nearest, distance
+
+def nearest_businesses(latitude: float, longitude: float, count: int):
+    """Return a subquery of the `count` businesses nearest to a point: (id, nearest).
+
+    With no other filter the GiST index walked nearest-first (kNN) is its only index
+    path, so the walk stops after `count` entries however many businesses are around.
+    A radius filter next to the `<->` ordering lets the planner, which estimates
+    earth_box() matches at 0.1% of the table, pick a bitmap scan and sort every
+    business in the radius instead.
+    """
+    center = func.ll_to_earth(latitude, longitude)
+    point = func.ll_to_earth(models.Business.latitude, models.Business.longitude)
+    nearest = point.op("<->", return_type=Float)(center).label("nearest")
+    return (
+        select(models.Business.id, nearest)
+        .where(models.Business.latitude.isnot(None), models.Business.longitude.isnot(None))
+        .order_by(nearest, models.Business.id)
+        .limit(count)
+        .subquery("nearest_businesses")
+    )
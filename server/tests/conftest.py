@@ -0,0 +1,145 @@
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The app modules are flat in server/ and import each other by module name
+sys.path.insert(0, SERVER_DIR)
+
+# ✅ Database tests run against a throwaway Postgres named by TEST_DATABASE_URL; its
+# public schema is dropped and rebuilt with the Alembic migrations. Without it they
+# are skipped. DATABASE_URL is always overridden so tests never touch a real database.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL or "postgresql://nexdoor-tests.invalid/unused"
+os.environ["ASYNC_DATABASE_URL"] = ""
+os.environ["READ_DATABASE_URL"] = ""
+# Statement budgets (database.query_budget) fail the request instead of logging
+os.environ["QUERY_BUDGET_STRICT"] = "true"
+
+TABLES = "bookings, services, businesses, users"
+
+# ✅ Benchmarks seed large data sets and assert timings, so they only run on request
+benchmark = pytest.mark.skipif(
+    os.getenv("RUN_BENCHMARKS", "false").lower() not in ("1", "true", "yes"), reason="RUN_BENCHMARKS is not set"
+)
+
+
+@pytest.fixture(scope="session")
+def migrated_db():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import text
+    from database import engine
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    config = Config(os.path.join(SERVER_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(SERVER_DIR, "alembic"))
+    command.upgrade(config, "head")
+    return engine
+
+
+@pytest.fixture(scope="session")
+def client(migrated_db):
+    from fastapi.testclient import TestClient
+    import main
+
+    # One client for the session: the async engine's pooled connections belong to its event loop
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db(migrated_db):
+    from sqlalchemy import text
+    from database import SessionLocal, recent_writers
+    from routers.auth import user_cache
+
+    session = SessionLocal()
+    yield session
+    session.close()
+    with migrated_db.begin() as conn:
+        conn.execute(text(f"TRUNCATE {TABLES} CASCADE"))
+    user_cache.clear()
+    recent_writers.clear()
+
+
+# ✅ Seed helpers
+def make_user(db, uid=None):
+    import models
+
+    uid = uid or f"user-{uuid.uuid4().hex[:8]}"
+    user = models.User(id=uuid.uuid4(), uid=uid, email=f"{uid}@example.com", full_name=uid, saved_businesses=[])
+    db.add(user)
+    db.commit()
+    return user
+
+
+def make_business(db, owner, services=3, **fields):
+    import models
+
+    business = models.Business(
+        id=uuid.uuid4(),
+        owner_id=owner.uid,
+        name=fields.pop("name", "Corner Bakery"),
+        category=fields.pop("category", "Food"),
+        business_type=fields.pop("business_type", "Bakery"),
+        location=fields.pop("location", "Downtown"),
+        address=fields.pop("address", "1 Main St"),
+        **fields,
+    )
+    db.add(business)
+    for i in range(services):
+        db.add(models.Service(
+            id=uuid.uuid4(),
+            business_id=business.id,
+            owner_id=owner.uid,
+            name=f"Service {i}",
+            duration=30,
+            price=10.0 + i,
+            available_days=["mon", "tue", "wed", "thu", "fri"],
+            available_hours=["09:00-17:00"],
+        ))
+    db.commit()
+    return business
+
+
+def make_bookings(db, service_id, user, count, start=None, length=timedelta(minutes=30)):
+    import models
+
+    start = start or datetime(2026, 11, 2, 9, tzinfo=timezone.utc)
+    bookings = [
+        models.Booking(
+            id=uuid.uuid4(),
+            service_id=service_id,
+            user_id=user.id,
+            start_time=start + i * length,
+            end_time=start + (i + 1) * length,
+            status="confirmed",
+        )
+        for i in range(count)
+    ]
+    db.add_all(bookings)
+    db.commit()
+    return bookings
+
+
+# ✅ Plan helpers
+def uses_knn_index(plan: str, index: str = "ix_businesses_earth") -> bool:
+    """Whether an EXPLAIN plan walks `index` nearest-first: a scan of it with an Order By."""
+    lines = plan.splitlines()
+    for position, line in enumerate(lines):
+        if f"Scan using {index}" in line:
+            for detail in lines[position + 1:]:
+                if detail.lstrip().startswith("->"):
+                    break
+                if "Order By:" in detail:
+                    return True
+    return False
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+from pydantic import ValidationError
+
+import schemas
+from availability import BusyIndex, free_slots, parse_windows
+
+MONDAY = datetime(2026, 11, 2, tzinfo=timezone.utc)
+
+
+def test_free_slots_skip_busy_intervals():
+    windows = parse_windows(("mon",), ("09:00-11:00",))
+    busy = BusyIndex([(MONDAY.replace(hour=9, minute=30), MONDAY.replace(hour=10))])
+    slots = free_slots(windows, 30, busy, MONDAY, MONDAY + timedelta(days=1), timezone.utc)
+    assert [start.strftime("%H:%M") for start, _ in slots] == ["09:00", "10:00", "10:30"]
+
+
+def at(hour, minute=0):
+    return MONDAY.replace(hour=hour, minute=minute)
+
+
+def test_free_between_skips_gaps_shorter_than_min_length():
+    busy = [(at(9), at(9, 50)), (at(10), at(11)), (at(12), at(13))]
+    for index in (BusyIndex(busy), BusyIndex(busy, presorted=True)):
+        assert index.free_between(at(9), at(14)) == [(at(9, 50), at(10)), (at(11), at(12)), (at(13), at(14))]
+        assert index.free_between(at(9), at(14), timedelta(minutes=30)) == [(at(11), at(12)), (at(13), at(14))]
+
+
+def test_free_slots_are_in_the_requested_zone():
+    zone = ZoneInfo("Europe/Berlin")
+    windows = parse_windows(("mon",), ("09:00-11:00",))
+    busy = BusyIndex([(MONDAY.replace(hour=8), MONDAY.replace(hour=8, minute=30))])
+    slots = free_slots(windows, 30, busy, MONDAY, MONDAY + timedelta(days=1), zone)
+    assert [start.strftime("%H:%M") for start, _ in slots] == ["09:30", "10:00", "10:30"]
+    assert {start.tzinfo for start, _ in slots} == {zone}
+
+
+@pytest.mark.parametrize("duration, step", [(0, 0), (-15, 0), (30, -5)])
+def test_free_slots_reject_non_advancing_stride(duration, step):
+    windows = parse_windows(("mon",), ("09:00-17:00",))
+    with pytest.raises(ValueError):
+        free_slots(windows, duration, BusyIndex([]), MONDAY, MONDAY + timedelta(days=1), timezone.utc, step)
+
+
+@pytest.mark.parametrize("schema", [schemas.ServiceCreate, schemas.ServiceUpdate])
+def test_service_input_duration_must_be_positive(schema):
+    with pytest.raises(ValidationError):
+        schema(name="Cut", duration=0, price=10)
+
+
+def test_business_input_service_duration_must_be_positive():
+    with pytest.raises(ValidationError):
+        schemas.BusinessCreate(
+            name="Salon", category="Beauty", business_type="Salon", location="Downtown", address="1 Main St",
+            services=[{"name": "Cut", "duration": 0, "price": 10}],
+        )
+
+
+def test_stored_service_with_bad_duration_still_serializes():
+    service = schemas.Service(
+        id="8c6f1a4e-1d2b-4c3a-9e8f-0a1b2c3d4e5f", business_id="1f2e3d4c-5b6a-4978-8a9b-0c1d2e3f4a5b",
+        name="Cut", duration=0, price=10, created_at=MONDAY,
+    )
+    assert service.duration == 0
+
+
+def test_busy_blocks_give_the_same_slots_as_every_booking(db):
+    import random
+    import uuid
+
+    from sqlalchemy import insert
+
+    import models
+    from conftest import make_business, make_user
+    from routers.services import busy_blocks_query
+
+    owner = make_user(db)
+    service_id = make_business(db, owner, services=1).services[0].id
+    rng = random.Random(7)
+    rows, cursor = [], MONDAY
+    for _ in range(500):
+        cursor += timedelta(minutes=rng.choice([0, 0, 5, 10, 20, 30, 45, 60, 120]))
+        end = cursor + timedelta(minutes=rng.choice([10, 15, 30, 60]))
+        status = "cancelled" if rng.random() < 0.15 else "confirmed"
+        rows.append({"id": uuid.uuid4(), "service_id": service_id, "user_id": owner.id,
+                     "start_time": cursor, "end_time": end, "status": status})
+        if status == "confirmed":
+            cursor = end
+    db.execute(insert(models.Booking), rows)
+    db.commit()
+
+    windows = parse_windows(("mon", "tue", "wed", "thu", "fri"), ("08:00-12:00", "13:00-20:30"))
+    zone = ZoneInfo("Europe/Berlin")
+    start, end = MONDAY + timedelta(hours=5), MONDAY + timedelta(days=9)
+    live = [(row["start_time"], row["end_time"]) for row in rows if row["status"] != "cancelled"]
+    for duration, step in [(15, 0), (30, 0), (45, 15), (60, 5)]:
+        blocks = db.execute(busy_blocks_query(service_id, start, end, timedelta(minutes=duration))).all()
+        assert len(blocks) < len(live)
+        expected = free_slots(windows, duration, BusyIndex(live), start, end, zone, step)
+        assert free_slots(windows, duration, BusyIndex(blocks, presorted=True), start, end, zone, step) == expected
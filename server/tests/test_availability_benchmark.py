@@ -0,0 +1,98 @@
+"""A month of availability for a service with 10k bookings stays under AVAILABILITY_BUDGET_MS.
+
+Opt-in: RUN_BENCHMARKS=1. The endpoint timing also needs TEST_DATABASE_URL.
+"""
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import insert, text
+
+from availability import WEEKDAYS, BusyIndex, free_slots, parse_windows
+from conftest import benchmark, make_business, make_user
+
+BOOKINGS = 10_000
+BUDGET_MS = float(os.getenv("AVAILABILITY_BUDGET_MS", "10"))
+RUNS = 25
+ZONE = ZoneInfo("Europe/Berlin")
+MONTH_START = datetime(2026, 11, 1, tzinfo=ZONE)
+MONTH_END = datetime(2026, 12, 1, tzinfo=ZONE)
+
+
+def month_of_bookings():
+    """BOOKINGS 3-minute bookings one minute apart, packed into the month."""
+    start = MONTH_START.astimezone(timezone.utc)
+    return [
+        (start + timedelta(minutes=4 * i), start + timedelta(minutes=4 * i + 3))
+        for i in range(BOOKINGS)
+    ]
+
+
+def best_ms(fn):
+    """Fastest of RUNS calls: slower ones measure other load on the machine, not the code."""
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+@benchmark
+def test_month_of_slots_at_10k_bookings():
+    rows = month_of_bookings()
+    windows = parse_windows(tuple(WEEKDAYS), ("00:00-24:00",))
+
+    def compute():
+        return free_slots(windows, 30, BusyIndex(rows, presorted=True), MONTH_START, MONTH_END, ZONE)
+
+    assert compute()
+    elapsed = best_ms(compute)
+    print(f"BusyIndex + free_slots, {BOOKINGS} bookings over a month: {elapsed:.2f} ms")
+    assert elapsed < BUDGET_MS
+
+
+@benchmark
+def test_availability_endpoint_at_10k_bookings(client, db):
+    import models
+
+    owner = make_user(db)
+    service = make_business(db, owner, services=1).services[0]
+    service.available_days = WEEKDAYS
+    service.available_hours = ["00:00-24:00"]
+    db.execute(insert(models.Booking), [
+        {"id": uuid.uuid4(), "service_id": service.id, "user_id": owner.id,
+         "start_time": start, "end_time": end, "status": "confirmed"}
+        for start, end in month_of_bookings()
+    ])
+    db.commit()
+    # Fresh statistics up front, so autovacuum does not analyze the table mid-benchmark
+    db.execute(text("ANALYZE bookings"))
+    db.commit()
+
+    from routers.services import busy_blocks_query
+
+    length = timedelta(minutes=service.duration)
+    fetched = best_ms(lambda: db.execute(busy_blocks_query(service.id, MONTH_START, MONTH_END, length)).all())
+    blocks = db.execute(busy_blocks_query(service.id, MONTH_START, MONTH_END, length)).all()
+    windows = parse_windows(tuple(WEEKDAYS), ("00:00-24:00",))
+    computed = best_ms(
+        lambda: free_slots(windows, service.duration, BusyIndex(blocks, presorted=True), MONTH_START, MONTH_END, ZONE)
+    )
+
+    def request():
+        response = client.get(
+            f"/api/v1/services/{service.id}/availability",
+            params={"start": MONTH_START.isoformat(), "end": MONTH_END.isoformat(), "tz": "Europe/Berlin"},
+            headers={"user-id": owner.uid},
+        )
+        assert response.status_code == 200
+
+    served = best_ms(request)
+    print(
+        f"Availability with {BOOKINGS} bookings: {fetched:.2f} ms busy-block query ({len(blocks)} rows), "
+        f"{computed:.2f} ms computing, {served:.2f} ms per request through the test client"
+    )
+    assert fetched + computed < BUDGET_MS
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from conftest import make_business, make_user
+
+# Defaults make 3,200 attempts; raise them for a longer soak run
+THREADS = int(os.getenv("BOOKING_STRESS_THREADS", "32"))
+ATTEMPTS_PER_THREAD = int(os.getenv("BOOKING_STRESS_ATTEMPTS", "100"))
+
+OVERLAPS = text("""
+    SELECT count(*) FROM bookings a JOIN bookings b
+      ON a.service_id = b.service_id AND a.id < b.id
+     AND a.status <> 'cancelled' AND b.status <> 'cancelled'
+     AND tstzrange(a.start_time, a.end_time, '[)') && tstzrange(b.start_time, b.end_time, '[)')
+""")
+
+
+def test_concurrent_overlapping_bookings_never_overlap(migrated_db, db):
+    import schemas
+    from database import SessionLocal
+    from routers.bookings import create_booking
+
+    owner = make_user(db)
+    service_id = make_business(db, owner, services=1).services[0].id
+    # Plain ids: the fixture session's users are expired after commit and must not be
+    # reloaded from worker threads, as a Session is not thread-safe
+    customers = [SimpleNamespace(id=make_user(db).id) for _ in range(THREADS)]
+    base = datetime(2026, 11, 2, 9, tzinfo=timezone.utc)
+    # 30-minute bookings starting every 10 minutes: most candidates overlap each other
+    candidates = [base + timedelta(minutes=10 * i) for i in range(max(12, THREADS * ATTEMPTS_PER_THREAD // 8))]
+    barrier = threading.Barrier(THREADS)
+
+    def book(worker):
+        user = customers[worker]
+        outcomes = []
+        barrier.wait()
+        for attempt in range(ATTEMPTS_PER_THREAD):
+            start = candidates[(worker * 3 + attempt * 7) % len(candidates)]
+            session = SessionLocal()
+            try:
+                create_booking(
+                    schemas.BookingCreate(service_id=service_id, start_time=start, end_time=start + timedelta(minutes=30)),
+                    db=session,
+                    user=user,
+                )
+                outcomes.append(201)
+            except HTTPException as e:
+                outcomes.append(e.status_code)
+            finally:
+                session.close()
+        return outcomes
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        outcomes = [code for result in pool.map(book, range(THREADS)) for code in result]
+    elapsed = time.perf_counter() - started
+    print(
+        f"{len(outcomes)} booking attempts from {THREADS} threads in {elapsed:.2f}s "
+        f"({len(outcomes) / elapsed:.0f}/s): {outcomes.count(201)} created, {outcomes.count(409)} conflicts"
+    )
+
+    assert set(outcomes) <= {201, 409}
+    assert outcomes.count(201) >= 1
+    assert outcomes.count(409) >= 1
+    with migrated_db.connect() as conn:
+        assert conn.execute(OVERLAPS).scalar() == 0
+        booked = conn.execute(text("SELECT count(*) FROM bookings")).scalar()
+    assert booked == outcomes.count(201)
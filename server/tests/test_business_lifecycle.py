@@ -0,0 +1,50 @@
+"""Creating and deleting a business keeps the owner's maxed_* flags in step."""
+from conftest import make_user
+
+BUSINESS = {
+    "name": "Corner Bakery", "category": "Food", "business_type": "Bakery",
+    "location": "Downtown", "address": "1 Main St",
+    "services": [{"name": "Cake", "duration": 30, "price": 12.0}],
+}
+
+
+def flags(db, user):
+    db.refresh(user)
+    return user.maxed_business, user.maxed_services
+
+
+def test_create_business_sets_owner_flags(client, db):
+    owner = make_user(db)
+
+    response = client.post("/api/v1/businesses/create_business", json=BUSINESS, headers={"user-id": owner.uid})
+    assert response.status_code == 200
+    assert flags(db, owner) == (True, True)
+    assert client.post("/api/v1/businesses/create_business", json=BUSINESS, headers={"user-id": owner.uid}).status_code == 403
+
+
+def test_deleting_the_business_lets_the_owner_create_another(client, db):
+    owner = make_user(db)
+    headers = {"user-id": owner.uid}
+    business_id = client.post("/api/v1/businesses/create_business", json=BUSINESS, headers=headers).json()["id"]
+
+    assert client.post(f"/api/v1/businesses/delete_business/{business_id}", headers=headers).status_code == 204
+    assert flags(db, owner) == (False, False)
+    assert client.post("/api/v1/businesses/create_business", json=BUSINESS, headers=headers).status_code == 200
+
+
+def test_deleting_the_last_service_lets_the_owner_add_one(client, db):
+    owner = make_user(db)
+    headers = {"user-id": owner.uid}
+    business = client.post(
+        "/api/v1/businesses/create_business",
+        json={**BUSINESS, "services": [*BUSINESS["services"], {"name": "Bread", "duration": 15, "price": 4.0}]},
+        headers=headers,
+    ).json()
+    first, second = (service["id"] for service in business["services"])
+
+    assert client.delete(f"/api/v1/services/delete_service/{first}", headers=headers).status_code == 204
+    assert flags(db, owner) == (True, True)
+    assert client.delete(f"/api/v1/services/delete_service/{second}", headers=headers).status_code == 204
+    assert flags(db, owner) == (True, False)
+    service = {"name": "Cake", "duration": 30, "price": 12.0}
+    assert client.post("/api/v1/services/create_service", json=service, headers=headers).status_code == 200
@@ -0,0 +1,35 @@
+import models
+from chatbot import build_retrieval_queries, query_keywords
+from conftest import make_business, make_user
+
+
+def test_query_keywords_drop_short_words_and_stopwords():
+    assert query_keywords("Where can I get a HAIRCUT near downtown, today?") == ["downtown", "haircut", "today"]
+    assert query_keywords("is it there?") == []
+
+
+def retrieve(db, question):
+    businesses_queries, services_query = build_retrieval_queries(question)
+    for query in businesses_queries:
+        businesses = db.execute(query).all()
+        if businesses:
+            return businesses, db.execute(services_query([b.id for b in businesses])).all()
+    return [], []
+
+
+def test_retrieval_prefers_keyword_matches(db):
+    owner = make_user(db)
+    make_business(db, owner, name="Corner Bakery", category="Food")
+    barber = make_business(db, owner, name="Sharp Lines", category="Beauty", services=0)
+    db.add(models.Service(
+        business_id=barber.id, owner_id=owner.uid, name="Haircut", duration=30, price=20.0,
+        available_days=["mon"], available_hours=["09:00-17:00"],
+    ))
+    db.commit()
+
+    businesses, services = retrieve(db, "Where can I get a haircut?")
+    assert [business.name for business in businesses] == ["Sharp Lines"]
+    assert [service.name for service in services] == ["Haircut"]
+
+    businesses, _ = retrieve(db, "What is open?")
+    assert {business.name for business in businesses} == {"Corner Bakery", "Sharp Lines"}
@@ -0,0 +1,38 @@
+import uuid
+from datetime import datetime, timezone
+
+import orjson
+from asyncpg.pgproto.pgproto import UUID as AsyncpgUUID
+
+from export import csv_chunk, ndjson_chunk
+
+COLUMNS = ["id", "service_id", "start_time", "status"]
+
+
+def asyncpg_row():
+    return (
+        AsyncpgUUID(str(uuid.uuid4())),
+        AsyncpgUUID(str(uuid.uuid4())),
+        datetime(2026, 11, 2, 9, 30, tzinfo=timezone.utc),
+        "confirmed",
+    )
+
+
+def test_ndjson_chunk_encodes_asyncpg_rows():
+    rows = [asyncpg_row(), asyncpg_row()]
+    lines = ndjson_chunk(COLUMNS, rows).splitlines()
+    assert [orjson.loads(line) for line in lines] == [
+        {
+            "id": str(row[0]),
+            "service_id": str(row[1]),
+            "start_time": "2026-11-02T09:30:00+00:00",
+            "status": "confirmed",
+        }
+        for row in rows
+    ]
+
+
+def test_csv_chunk_encodes_asyncpg_rows():
+    row = asyncpg_row()
+    lines = csv_chunk(COLUMNS, [row], header=True).decode().splitlines()
+    assert lines == [",".join(COLUMNS), f"{row[0]},{row[1]},2026-11-02T09:30:00+00:00,confirmed"]
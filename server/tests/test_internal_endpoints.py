@@ -0,0 +1,27 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from routers import internal
+
+PATHS = ["/metrics", "/internal/db_pool"]
+
+
+@pytest.fixture
+def bare_client():
+    # No lifespan: these endpoints read in-process state only
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_internal_endpoints_are_off_without_a_token_setting(bare_client, monkeypatch, path):
+    monkeypatch.setattr(internal, "INTERNAL_API_TOKEN", None)
+    assert bare_client.get(path, headers={"Authorization": "Bearer anything"}).status_code == 404
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_internal_endpoints_require_the_token(bare_client, monkeypatch, path):
+    monkeypatch.setattr(internal, "INTERNAL_API_TOKEN", "s3cret")
+    assert bare_client.get(path).status_code == 401
+    assert bare_client.get(path, headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert bare_client.get(path, headers={"Authorization": "Bearer s3cret"}).status_code == 200
@@ -0,0 +1,11 @@
+def test_models_declare_every_migrated_index(migrated_db):
+    """An index created by a migration but missing from the models would be dropped
+    by the next `alembic revision --autogenerate`."""
+    from alembic.autogenerate import compare_metadata
+    from alembic.migration import MigrationContext
+    import models
+
+    with migrated_db.connect() as conn:
+        diffs = compare_metadata(MigrationContext.configure(conn), models.Base.metadata)
+    removed = [diff[1].name for diff in diffs if isinstance(diff, tuple) and diff[0] == "remove_index"]
+    assert removed == []
@@ -0,0 +1,36 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from asyncpg.pgproto.pgproto import UUID as AsyncpgUUID
+from fastapi import HTTPException
+
+from pagination import decode_cursor, encode_cursor, next_cursor
+
+
+def test_cursor_round_trip():
+    values = [datetime(2026, 10, 18, 9, 30, tzinfo=timezone.utc), uuid.uuid4(), 0.75, 3, "x"]
+    assert decode_cursor(encode_cursor(values)) == values
+
+
+def test_cursor_round_trip_asyncpg_uuid():
+    # asyncpg returns its own uuid.UUID subclass for UUID columns
+    value = AsyncpgUUID(str(uuid.uuid4()))
+    assert type(value) is not uuid.UUID
+    decoded = decode_cursor(encode_cursor([value]))
+    assert decoded == [uuid.UUID(str(value))]
+    assert type(decoded[0]) is uuid.UUID
+
+
+def test_next_cursor_from_asyncpg_row():
+    created_at = datetime(2026, 10, 18, tzinfo=timezone.utc)
+    rows = [("row", created_at, AsyncpgUUID(str(uuid.uuid4())))] * 2
+    cursor = next_cursor(rows, limit=2)
+    assert decode_cursor(cursor)[0] == created_at
+    assert next_cursor(rows, limit=3) is None
+
+
+def test_invalid_cursor_is_400():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("not-a-cursor")
+    assert error.value.status_code == 400
@@ -0,0 +1,69 @@
+"""list_businesses with lat/lng returns the same pages as filtering every business by radius."""
+import random
+import uuid
+
+from sqlalchemy import insert, select
+
+from conftest import make_user
+
+CENTER = (12.5, 77.5)
+
+
+def seed_businesses(db, owner, count):
+    import models
+
+    rng = random.Random(7)
+    rows = [
+        {
+            "id": uuid.uuid4(), "owner_id": owner.uid, "name": f"Business {i}", "category": "Food",
+            "business_type": "Cafe", "location": "Downtown", "address": f"{i} Main St",
+            # a few without coordinates, and some sharing a spot so distances tie
+            "latitude": None if i % 25 == 0 else CENTER[0] + round(rng.uniform(-0.2, 0.2), 2 if i % 5 == 0 else 6),
+            "longitude": None if i % 25 == 0 else CENTER[1] + round(rng.uniform(-0.2, 0.2), 2 if i % 5 == 0 else 6),
+        }
+        for i in range(count)
+    ]
+    db.execute(insert(models.Business), rows)
+    db.commit()
+
+
+def expected_ids(db, radius_km, search=None):
+    import models
+    from search import business_proximity, business_search
+
+    match, nearest, _ = business_proximity(*CENTER, radius_km)
+    query = select(models.Business.id).filter(match).order_by(nearest, models.Business.id)
+    if search:
+        query = query.filter(business_search(search)[0])
+    return [str(business_id) for business_id in db.execute(query).scalars()]
+
+
+def nearby_ids(client, owner, radius_km, skip, limit, search=None):
+    params = {"lat": CENTER[0], "lng": CENTER[1], "radius_km": radius_km, "skip": skip, "limit": limit}
+    if search:
+        params["search"] = search
+    response = client.get("/api/v1/businesses/list_businesses", params=params, headers={"user-id": owner.uid})
+    assert response.status_code == 200, response.text
+    return [business["id"] for business in response.json()]
+
+
+def test_nearby_pages_match_a_radius_filter(client, db):
+    owner = make_user(db)
+    seed_businesses(db, owner, 400)
+
+    for radius_km in (1, 5, 15):
+        expected = expected_ids(db, radius_km)
+        pages = []
+        for skip in range(0, len(expected) + 20, 20):
+            pages += nearby_ids(client, owner, radius_km, skip, 20)
+        assert pages == expected, radius_km
+    assert len(expected_ids(db, 1)) < 20 < len(expected_ids(db, 15))
+
+
+def test_nearby_search_matches_a_radius_filter(client, db):
+    owner = make_user(db)
+    seed_businesses(db, owner, 400)
+
+    expected = expected_ids(db, 15, search="Business 12")
+    assert expected
+    assert nearby_ids(client, owner, 15, 0, len(expected) + 10, search="Business 12") == expected
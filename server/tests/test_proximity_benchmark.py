@@ -0,0 +1,73 @@
+"""Nearest businesses stay as fast at 1M businesses as at 10k, through the kNN index.
+
+Opt-in: RUN_BENCHMARKS=1, and TEST_DATABASE_URL. PROXIMITY_SIZES lists the table sizes
+(comma-separated); businesses are spread uniformly over one degree square, so the
+number inside the radius grows with the table.
+"""
+import os
+import time
+
+from sqlalchemy import select, text
+
+from conftest import benchmark, make_user, uses_knn_index
+
+SIZES = [int(size) for size in os.getenv("PROXIMITY_SIZES", "10000,100000,1000000").split(",")]
+# The largest size may take this many times the smallest one's latency
+MAX_SLOWDOWN = float(os.getenv("PROXIMITY_MAX_SLOWDOWN", "3"))
+RUNS = 25
+CENTER = (12.5, 77.5)
+RADIUS_KM = 10
+PAGE = 20
+
+
+def grow_to(db, owner, current, size):
+    """Add businesses numbered current+1..size at random points, in one INSERT ... SELECT."""
+    db.execute(text("SELECT setseed(:seed)"), {"seed": current / max(SIZES)})
+    db.execute(
+        text(
+            """
+            INSERT INTO businesses (id, owner_id, name, category, business_type, location, address,
+                                    is_active, latitude, longitude, created_at)
+            SELECT gen_random_uuid(), :owner, 'Business ' || i, 'Food', 'Cafe', 'Downtown', i || ' Main St',
+                   true, 12 + random(), 77 + random(), now()
+            FROM generate_series(:first, :last) AS i
+            """
+        ),
+        {"owner": owner.uid, "first": current + 1, "last": size},
+    )
+    db.commit()
+    db.execute(text("ANALYZE businesses"))
+
+
+def best_ms(fn):
+    """Fastest of RUNS calls: slower ones measure other load on the machine, not the code."""
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+@benchmark
+def test_nearest_page_latency_is_flat_across_sizes(db):
+    import models
+    from routers.businesses import nearby_query
+
+    query = nearby_query(select(models.Business), *CENTER, RADIUS_KM, 0, PAGE)
+    compiled = query.compile(dialect=db.get_bind().dialect)
+    owner = make_user(db)
+
+    timings, current = {}, 0
+    for size in sorted(SIZES):
+        grow_to(db, owner, current, size)
+        current = size
+        plan = "\n".join(row[0] for row in db.connection().exec_driver_sql("EXPLAIN " + str(compiled), compiled.params))
+        assert uses_knn_index(plan), f"{size} businesses:\n{plan}"
+        assert len(db.execute(query).all()) == PAGE
+        timings[size] = best_ms(lambda: db.execute(query).all())
+        print(f"nearest {PAGE} of {size} businesses: {timings[size]:.2f} ms")
+    db.rollback()
+
+    smallest, largest = timings[min(timings)], timings[max(timings)]
+    assert largest <= MAX_SLOWDOWN * smallest, timings
@@ -0,0 +1,82 @@
+"""Every budgeted endpoint runs within its query_budget.
+
+QUERY_BUDGET_STRICT is on for the test suite, so a request executing more SQL
+statements than its budget raises QueryBudgetExceeded here.
+"""
+from conftest import make_bookings, make_business, make_user
+
+
+def headers(user):
+    return {"user-id": user.uid}
+
+
+def test_list_businesses(client, db):
+    owner = make_user(db)
+    for _ in range(5):
+        make_business(db, make_user(db), services=4)
+    make_business(db, owner, services=4)
+
+    response = client.get("/api/v1/businesses/list_businesses", params={"limit": 3}, headers=headers(owner))
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+
+    response = client.get("/api/v1/businesses/list_businesses", params={"limit": 3, "cursor": ""}, headers=headers(owner))
+    assert response.status_code == 200
+    next_page = response.headers["X-Next-Cursor"]
+    response = client.get("/api/v1/businesses/list_businesses", params={"limit": 3, "cursor": next_page}, headers=headers(owner))
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+
+
+def test_get_business(client, db):
+    owner = make_user(db)
+    business = make_business(db, owner, services=5)
+
+    response = client.get(f"/api/v1/businesses/get_business/{business.id}", headers=headers(owner))
+    assert response.status_code == 200
+    assert len(response.json()["services"]) == 5
+
+    revalidated = client.get(
+        f"/api/v1/businesses/get_business/{business.id}",
+        headers={**headers(owner), "If-None-Match": response.headers["ETag"]},
+    )
+    assert revalidated.status_code == 304
+
+
+def test_list_and_get_services(client, db):
+    owner = make_user(db)
+    business = make_business(db, owner, services=6)
+
+    response = client.get("/api/v1/services/list_services", params={"business_id": str(business.id)}, headers=headers(owner))
+    assert response.status_code == 200
+    assert len(response.json()) == 6
+
+    service_id = response.json()[0]["id"]
+    assert client.get(f"/api/v1/services/get_service/{service_id}", headers=headers(owner)).status_code == 200
+    assert client.get("/api/v1/services/get_service", headers=headers(owner)).status_code == 200
+
+
+def test_service_availability(client, db):
+    owner = make_user(db)
+    business = make_business(db, owner, services=1)
+    service = business.services[0]
+    make_bookings(db, service.id, owner, 4)
+
+    response = client.get(
+        f"/api/v1/services/{service.id}/availability",
+        params={"start": "2026-11-02T00:00:00Z", "end": "2026-11-04T00:00:00Z"},
+        headers=headers(owner),
+    )
+    assert response.status_code == 200
+    assert response.json()["slots"]
+
+
+def test_list_bookings(client, db):
+    owner = make_user(db)
+    business = make_business(db, owner, services=1)
+    make_bookings(db, business.services[0].id, owner, 5)
+
+    response = client.get("/api/v1/bookings/list_booking", params={"limit": 2, "cursor": ""}, headers=headers(owner))
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert response.headers["X-Next-Cursor"]
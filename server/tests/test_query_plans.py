@@ -0,0 +1,252 @@
+"""Router queries are served by indexes.
+
+Every endpoint is called against a seeded database while the statements it sends are
+recorded; each one then runs under EXPLAIN with enable_seqscan off. That setting only
+discourages sequential scans, so one remaining in a plan means no index can serve the
+query. Scans that are deliberate are listed in EXEMPT with the reason.
+"""
+import asyncio
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, insert, text
+
+from conftest import uses_knn_index
+
+USERS = 20
+BUSINESSES = 200
+SERVICES_PER_BUSINESS = 3
+BOOKINGS_PER_SERVICE = 5
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+# (step, table) -> why a sequential scan of the table is expected there
+UNFILTERED_PAGE = "unfiltered, unordered skip/limit page: the scan stops after skip + limit rows (keyset paging is the indexed way through a large table)"
+EXEMPT = {
+    ("list_businesses page", "businesses"): UNFILTERED_PAGE,
+    ("list_services page", "services"): UNFILTERED_PAGE,
+    ("list_booking page", "bookings"): UNFILTERED_PAGE,
+    ("chatbot fallback", "businesses"): "unranked fallback for questions without keywords: any CHAT_TOP_K active businesses, the LIMIT stops the scan",
+}
+
+
+@pytest.fixture
+def seeded(migrated_db, db):
+    import models
+
+    base = datetime(2026, 11, 2, 9, tzinfo=timezone.utc)
+    users = [
+        {"id": uuid.uuid4(), "uid": f"plan-user-{i}", "email": f"plan-{i}@example.com", "saved_businesses": []}
+        for i in range(USERS)
+    ]
+    businesses, services, bookings = [], [], []
+    for i in range(BUSINESSES):
+        owner = users[i % USERS]
+        business_id = uuid.uuid4()
+        businesses.append({
+            "id": business_id, "owner_id": owner["uid"], "name": f"Business {i}", "category": "Food",
+            "business_type": "Cafe", "location": "Downtown", "address": f"{i} Main St",
+            "latitude": 12.9 + (i % 20) * 0.01, "longitude": 77.5 + (i // 20) * 0.01,
+            "created_at": base - timedelta(minutes=i),
+        })
+        for j in range(SERVICES_PER_BUSINESS):
+            service_id = uuid.uuid4()
+            services.append({
+                "id": service_id, "business_id": business_id, "owner_id": owner["uid"], "name": f"Service {i}-{j}",
+                "duration": 30, "price": 10.0, "available_days": ["mon"], "available_hours": ["09:00-17:00"],
+                "created_at": base - timedelta(minutes=i, seconds=j),
+            })
+            for k in range(BOOKINGS_PER_SERVICE):
+                start = base + timedelta(minutes=30 * k)
+                bookings.append({
+                    "id": uuid.uuid4(), "service_id": service_id, "user_id": users[(i + k) % USERS]["id"],
+                    "start_time": start, "end_time": start + timedelta(minutes=30), "status": "confirmed",
+                    "created_at": base - timedelta(minutes=i, seconds=k),
+                })
+    db.execute(insert(models.User), users)
+    db.execute(insert(models.Business), businesses)
+    db.execute(insert(models.Service), services)
+    db.execute(insert(models.Booking), bookings)
+    db.commit()
+    with migrated_db.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        conn.commit()
+    return {"user": users[3], "business": businesses[7], "service": services[11], "booking": bookings[25]}
+
+
+class StatementLog:
+    """Collects the distinct statements sent on an engine, keyed by the current step."""
+
+    def __init__(self):
+        self.step = None
+        self.statements = {}
+
+    def record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.step is None or executemany or statement.split(None, 1)[0].upper() not in EXPLAINABLE:
+            return
+        self.statements.setdefault((self.step, statement), (conn.dialect.driver, parameters))
+
+
+@pytest.fixture
+def recorded(migrated_db):
+    from database import async_engine
+
+    log = StatementLog()
+    engines = (migrated_db, async_engine.sync_engine)
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", log.record)
+    yield log
+    for engine in engines:
+        event.remove(engine, "before_cursor_execute", log.record)
+
+
+def router_calls(seeded):
+    """(step, method, path, request kwargs, expected status) covering every endpoint that queries."""
+    user, business, service, booking = seeded["user"], seeded["business"], seeded["service"], seeded["booking"]
+    owner = {"user-id": user["uid"]}
+    stale = {**owner, "If-None-Match": '"stale"'}
+    monday = datetime(2026, 11, 9, 10, tzinfo=timezone.utc)
+
+    def slot(start, service_id=service["id"]):
+        return {"service_id": str(service_id), "start_time": start.isoformat(), "end_time": (start + timedelta(minutes=30)).isoformat()}
+
+    new_services = [{"name": "Espresso", "duration": 15, "price": 3.0}, {"name": "Latte", "duration": 15, "price": 4.0}]
+    new_business = {
+        "name": "Plan Cafe", "category": "Food", "business_type": "Cafe", "location": "Downtown",
+        "address": "1 Plan St", "latitude": 12.95, "longitude": 77.55, "services": new_services,
+    }
+    new_owner = {"user-id": "plan-new-owner"}
+    businesses, services, bookings = "/api/v1/businesses", "/api/v1/services", "/api/v1/bookings"
+    return [
+        ("signup", "POST", "/api/v1/auth/signup", {"json": {
+            "email": "plan-new-owner@example.com", "uid": "plan-new-owner", "full_name": "New Owner",
+            "phone_number": "555", "location": "Downtown",
+        }}, 201),
+        ("get_current_user", "POST", "/api/v1/auth/get_current_user", {"headers": owner}, 200),
+
+        ("list_businesses page", "GET", f"{businesses}/list_businesses", {"params": {"skip": 20, "limit": 20}, "headers": owner}, 200),
+        ("list_businesses keyset", "GET", f"{businesses}/list_businesses", {"params": {"cursor": "", "limit": 20}, "headers": owner}, 200),
+        ("list_businesses search", "GET", f"{businesses}/list_businesses", {"params": {"search": "Business 7"}, "headers": owner}, 200),
+        ("list_businesses search keyset", "GET", f"{businesses}/list_businesses", {"params": {"search": "Business 7", "cursor": ""}, "headers": owner}, 200),
+        ("list_businesses near", "GET", f"{businesses}/list_businesses", {"params": {
+            "lat": business["latitude"], "lng": business["longitude"], "radius_km": 2, "limit": 20,
+        }, "headers": owner}, 200),
+        ("list_businesses near search", "GET", f"{businesses}/list_businesses", {"params": {
+            "lat": business["latitude"], "lng": business["longitude"], "radius_km": 2, "search": "Business 7",
+        }, "headers": owner}, 200),
+        ("get_business by id", "GET", f"{businesses}/get_business/{business['id']}", {"headers": stale}, 200),
+        ("get_business by owner", "GET", f"{businesses}/get_business", {"headers": stale}, 200),
+
+        ("list_services page", "GET", f"{services}/list_services", {"params": {"skip": 20, "limit": 20}, "headers": owner}, 200),
+        ("list_services keyset", "GET", f"{services}/list_services", {"params": {"cursor": "", "limit": 20}, "headers": owner}, 200),
+        ("list_services of a business", "GET", f"{services}/list_services", {"params": {"business_id": str(business["id"])}, "headers": owner}, 200),
+        ("list_services of a business keyset", "GET", f"{services}/list_services", {"params": {"business_id": str(business["id"]), "cursor": ""}, "headers": owner}, 200),
+        ("list_services search", "GET", f"{services}/list_services", {"params": {"search": "Service 7"}, "headers": owner}, 200),
+        ("get_service by id", "GET", f"{services}/get_service/{service['id']}", {"headers": stale}, 200),
+        ("get_service by owner", "GET", f"{services}/get_service", {"headers": owner}, 200),
+        ("availability", "GET", f"{services}/{service['id']}/availability", {"params": {
+            "start": "2026-11-02T00:00:00Z", "end": "2026-11-16T00:00:00Z",
+        }, "headers": owner}, 200),
+
+        ("list_booking page", "GET", f"{bookings}/list_booking", {"params": {"skip": 20, "limit": 20}, "headers": owner}, 200),
+        ("list_booking keyset", "GET", f"{bookings}/list_booking", {"params": {"cursor": "", "limit": 20}, "headers": owner}, 200),
+        ("list_booking of a user", "GET", f"{bookings}/list_booking", {"params": {"user_id": str(user["id"])}, "headers": owner}, 200),
+        ("list_booking of a user keyset", "GET", f"{bookings}/list_booking", {"params": {"user_id": str(user["id"]), "cursor": ""}, "headers": owner}, 200),
+        ("list_booking of a service", "GET", f"{bookings}/list_booking", {"params": {"service_id": str(service["id"])}, "headers": owner}, 200),
+        ("list_booking of a service keyset", "GET", f"{bookings}/list_booking", {"params": {"service_id": str(service["id"]), "cursor": ""}, "headers": owner}, 200),
+        ("export", "GET", f"{bookings}/export", {"headers": owner}, 200),
+        ("export of a service and range", "GET", f"{bookings}/export", {"params": {
+            "service_id": str(service["id"]), "start": "2026-11-02T00:00:00Z", "end": "2026-11-03T00:00:00Z",
+        }, "headers": owner}, 200),
+
+        ("create_booking", "POST", f"{bookings}/create_booking", {"json": slot(monday), "headers": owner}, 201),
+        ("bulk_create_booking", "POST", f"{bookings}/bulk_create_booking", {
+            "json": [slot(monday + timedelta(hours=1)), slot(monday + timedelta(hours=2))], "headers": owner,
+        }, 200),
+        ("get_booking", "GET", f"{bookings}/get_booking/{booking['id']}", {"headers": owner}, 200),
+        ("update_booking", "PUT", f"{bookings}/update_booking/{booking['id']}", {
+            "json": slot(monday + timedelta(days=1), booking["service_id"]), "headers": owner,
+        }, 200),
+        ("booking status", "PATCH", f"{bookings}/{booking['id']}/status", {"params": {"status": "confirmed"}, "headers": owner}, 200),
+        ("bulk_status", "PATCH", f"{bookings}/bulk_status", {
+            "json": [{"booking_id": str(booking["id"]), "status": "completed"}], "headers": owner,
+        }, 200),
+        ("delete_booking", "DELETE", f"{bookings}/delete_booking/{booking['id']}", {"headers": owner}, 204),
+
+        ("create_service", "POST", f"{services}/create_service", {"json": new_services[0], "headers": owner}, 200),
+        ("update_service", "PUT", f"{services}/update_service/", {"json": new_services[1], "headers": owner}, 200),
+        ("delete_service", "DELETE", f"{services}/delete_service/{service['id']}", {"headers": owner}, 204),
+
+        ("create_business", "POST", f"{businesses}/create_business", {"json": new_business, "headers": new_owner}, 200),
+        ("update_business", "POST", f"{businesses}/update_business", {
+            "json": {**new_business, "name": "Plan Bistro", "services": new_services[:1]}, "headers": new_owner,
+        }, 200),
+        ("delete_business", "POST", f"{businesses}/delete_business/{business['id']}", {"headers": {"user-id": business["owner_id"]}}, 204),
+    ]
+
+
+def run_chatbot_retrieval(db, recorded):
+    """The chat endpoints need the Gemini API, so their retrieval queries run directly."""
+    import chatbot
+
+    (ranked, fallback), services_query = chatbot.build_retrieval_queries("Where can I get Service 7 at a cafe?")
+    recorded.step = "chatbot retrieval"
+    business_ids = [row.id for row in db.execute(ranked)]
+    db.execute(services_query(business_ids)).all()
+    recorded.step = "chatbot fallback"
+    db.execute(fallback).all()
+    db.rollback()
+
+
+def explain_plans(engine, statements):
+    """EXPLAIN each recorded statement with its own parameters, through the driver that sent it."""
+    plans = {}
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        for key, (driver, parameters) in statements.items():
+            if driver == "psycopg2":
+                cursor.execute("EXPLAIN " + key[1], parameters)
+                plans[key] = "\n".join(row[0] for row in cursor.fetchall())
+    finally:
+        raw.rollback()
+        raw.close()
+
+    async def explain_async():
+        import asyncpg
+
+        connection = await asyncpg.connect(engine.url.set(drivername="postgresql").render_as_string(hide_password=False))
+        try:
+            await connection.execute("SET enable_seqscan = off")
+            for key, (driver, parameters) in statements.items():
+                if driver == "asyncpg":
+                    plans[key] = "\n".join(row[0] for row in await connection.fetch("EXPLAIN " + key[1], *parameters))
+        finally:
+            await connection.close()
+
+    asyncio.run(explain_async())
+    return plans
+
+
+def test_router_queries_use_indexes(migrated_db, client, db, seeded, recorded):
+    for step, method, path, kwargs, expected in router_calls(seeded):
+        recorded.step = step
+        response = client.request(method, path, **kwargs)
+        assert response.status_code == expected, f"{step}: {response.status_code} {response.text}"
+    run_chatbot_retrieval(db, recorded)
+    recorded.step = None
+
+    plans = explain_plans(migrated_db, recorded.statements)
+    sequential, exempted = {}, set()
+    for (step, statement), plan in plans.items():
+        for table in re.findall(r"Seq Scan on (\w+)", plan):
+            if (step, table) in EXEMPT:
+                exempted.add((step, table))
+            else:
+                sequential.setdefault(step, []).append(f"{statement}\n{plan}")
+    assert not sequential, "\n\n".join(f"{step}:\n" + "\n\n".join(plans) for step, plans in sequential.items())
+    assert exempted == set(EXEMPT), f"exemptions no longer needed: {set(EXEMPT) - exempted}"
+    # Nearest-first paging walks the GiST index in distance order instead of sorting the radius
+    assert any(uses_knn_index(plan) for (step, _), plan in plans.items() if step == "list_businesses near")
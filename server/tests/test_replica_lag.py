@@ -0,0 +1,55 @@
+import asyncio
+
+import database
+
+
+def run_monitor(seconds):
+    async def run():
+        # A request's statement counter, as MetricsMiddleware sets it
+        database.request_query_stats.set({"count": 0, "seconds": 0.0})
+        task = asyncio.create_task(database.monitor_replica_lag())
+        await asyncio.sleep(seconds)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+
+
+def test_lag_probe_runs_outside_request_stats(monkeypatch):
+    seen = []
+
+    async def probe():
+        seen.append(database.request_query_stats.get())
+        return 0.5
+
+    monkeypatch.setattr(database, "_query_replica_lag", probe)
+    monkeypatch.setattr(database, "READ_DATABASE_URL", "postgresql://replica.invalid/db")
+    monkeypatch.setitem(database._replica_lag, "seconds", None)
+    run_monitor(0.05)
+
+    assert seen and seen[0] is None
+    assert database.replica_lag_seconds() == 0.5
+    assert database.use_replica(None)
+
+
+def test_unreachable_replica_times_out_to_the_primary(monkeypatch):
+    async def hang():
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(database, "_query_replica_lag", hang)
+    monkeypatch.setattr(database, "READ_DATABASE_URL", "postgresql://replica.invalid/db")
+    monkeypatch.setattr(database, "READ_LAG_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setitem(database._replica_lag, "seconds", 0.0)
+    run_monitor(0.2)
+
+    assert database.replica_lag_seconds() is None
+    assert not database.use_replica(None)
+
+
+def test_writes_are_tracked_by_the_user_id_header_clients_send():
+    from starlette.requests import Request
+
+    sessions = database.get_db(Request({"type": "http", "headers": [(b"user-id", b"user-1")]}))
+    db = next(sessions)
+    assert db.info["user_id"] == "user-1"
+    sessions.close()
@@ -0,0 +1,51 @@
+"""update_business reconciles services in a fixed number of statements."""
+from conftest import make_business, make_user
+
+BUSINESS_FIELDS = ["name", "description", "category", "business_type", "location", "address"]
+
+
+def reconcile(client, db, service_count):
+    import models
+
+    owner = make_user(db)
+    business = make_business(db, owner, services=service_count)
+    business_id = business.id
+    # Plain snapshots: the ORM objects are expired (and one deleted) by the update
+    services = [
+        {column: getattr(service, column) for column in ("id", "name", "description", "duration", "price", "available_days", "available_hours")}
+        for service in sorted(business.services, key=lambda service: service.name)
+    ]
+    payload = {field: getattr(business, field) for field in BUSINESS_FIELDS}
+    payload["services"] = []
+    # Mix of change patterns: price only, name and days, unchanged; the last one is dropped
+    for i, service in enumerate(services[:-1]):
+        item = {**service, "id": str(service["id"])}
+        if i % 3 == 0:
+            item["price"] = service["price"] + 5
+        elif i % 3 == 1:
+            item["name"] = f"{service['name']} (renamed)"
+            item["available_days"] = ["sat", "sun"]
+        payload["services"].append(item)
+    payload["services"].append({"name": "New service", "duration": 45, "price": 20.0})
+
+    response = client.post("/api/v1/businesses/update_business", json=payload, headers={"user-id": owner.uid})
+    assert response.status_code == 200, response.text
+
+    db.expire_all()
+    stored = {service.id: service for service in db.query(models.Service).filter(models.Service.business_id == business_id)}
+    assert len(stored) == service_count  # one dropped, one added
+    for i, service in enumerate(services[:-1]):
+        current = stored[service["id"]]
+        if i % 3 == 0:
+            assert current.price == service["price"] + 5
+        elif i % 3 == 1:
+            assert current.name.endswith("(renamed)")
+            assert current.available_days == ["sat", "sun"]
+        else:
+            assert current.name == service["name"] and current.price == service["price"]
+    assert services[-1]["id"] not in stored
+    return int(response.headers["X-DB-Query-Count"])
+
+
+def test_statement_count_is_independent_of_service_count(client, db):
+    assert reconcile(client, db, 3) == reconcile(client, db, 30)